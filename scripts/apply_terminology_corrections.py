@@ -1,87 +1,185 @@
-
+import numpy as np
 import pandas as pd
 import json
-import re
+from pipeline_store import load_stage, save_stage, stage_xlsx_path
+from term_matcher import TermMatcher
+from term_normalizer import fold, normalizer
+from translation_catalog import LANGUAGE_NAMES, ROOT_DIR, load_app_locales
 
-def apply_terminology_corrections():
+CHANGE_COLUMNS = ["Clave", "Idioma", "Término", "Antes", "Después"]
+
+# Idiomas de destino (el español es el texto de origen y no se corrige)
+LANG_MAP = {
+    "en": "Inglés",
+    "de": "Alemán",
+    "fr": "Francés",
+    "it": "Italiano",
+    "pt": "Portugués",
+    "da": "Danés",
+    "no": "Noruego",
+    "sv": "Sueco"
+}
+
+def correct_term(value, term, standard, matcher, normalize):
     """
-    Aplica correcciones de coherencia terminológica basadas en el glosario maestro.
+    Sustituye en `value` solo las apariciones de `term` que difieren de la
+    forma estándar en mayúsculas o acentos ('afinacion' → 'afinación'), con
+    mayúscula inicial si la aparición la tenía. El resto del texto y las
+    formas flexionadas ('Rechnungen') se conservan.
     """
+    spans = normalize.spans(value)
+    # Offsets in the normalized text (words joined by one space) → word index
+    first_word, last_word, offset = {}, {}, 0
+    for index, token in enumerate(normalize.tokens(value)):
+        first_word[offset] = index
+        last_word[offset + len(token)] = index
+        offset += len(token) + 1
+
+    parts, position = [], 0
+    for start, end, found in matcher.finditer(value):
+        if found != term or start not in first_word or end not in last_word:
+            continue
+        begin, finish = spans[first_word[start]][0], spans[last_word[end]][1]
+        text = value[begin:finish]
+        if begin < position or fold(text) != fold(standard):
+            continue
+        parts.append(value[position:begin])
+        parts.append(standard[0].upper() + standard[1:] if text[0].isupper() else standard)
+        position = finish
+    parts.append(value[position:])
+    return "".join(parts)
+
+def terminology_corrections(df, glossary, lang_map=LANG_MAP):
+    """
+    Calcula las correcciones del glosario con máscaras por término e idioma.
+
+    Una celda es candidata si su clave contiene el término (\\bterm\\b) y
+    su valor contiene la forma del glosario de su idioma como palabra
+    normalizada (sin mayúsculas ni acentos y con el stemming ligero del
+    idioma: 'Invoices' cuenta como 'invoice' y 'Rechnungen' como
+    'Rechnung'); en ella solo se corrige el término con correct_term(). Los
+    términos se aplican en orden, y cada uno ve las correcciones de los
+    anteriores.
+
+    Devuelve (DataFrame corregido, change-set con CHANGE_COLUMNS): una fila
+    por celda modificada, con su valor original y el final.
+    """
+    df = df.copy()
+    keys = df["Clave"].to_numpy(dtype=object)
+    n_rows = len(df)
     
-    # Cargar archivos
-    file_path = "/home/ubuntu/piano-emotion-manager/TRADUCCIONES_MEJORADAS_DEEPL.xlsx"
-    glossary_path = "/home/ubuntu/piano-emotion-manager/glosario_maestro.json"
-    
-    df = pd.read_excel(file_path)
-    
-    with open(glossary_path, "r", encoding="utf-8") as f:
-        glossary = json.load(f)
-    
-    # Mapeo de idiomas
-    lang_map = {
-        "es": "Español",
-        "en": "Inglés",
-        "de": "Alemán",
-        "fr": "Francés",
-        "it": "Italiano",
-        "pt": "Portugués",
-        "da": "Danés",
-        "no": "Noruego",
-        "sv": "Sueco"
+    # Un autómata para las claves y, por idioma, otro con las formas del
+    # glosario en ese idioma sobre sus palabras normalizadas; cada columna se
+    # recorre una vez. Las claves se comparan sin stemming: 'pianos.*' no es
+    # un piano
+    key_matcher = TermMatcher(list(glossary), whole_words=True)
+    value_matchers = {
+        lang_name: TermMatcher(
+            {data["translations"][lang_code]: term for term, data in glossary.items() if lang_code in data["translations"]},
+            whole_words=True, normalize=normalizer(lang_code),
+        )
+        for lang_code, lang_name in lang_map.items()
     }
+    key_masks = {}
+    for term, rows in key_matcher.scan(keys).items():
+        key_masks[term] = np.zeros(n_rows, dtype=bool)
+        key_masks[term][rows] = True
     
-    print("Aplicando correcciones de coherencia terminológica...")
+    columns, value_masks = {}, {}
+    for lang_name in lang_map.values():
+        values = df[lang_name].to_numpy(dtype=object, copy=True)
+        values[pd.isna(values)] = None
+        columns[lang_name] = values
+        value_masks[lang_name] = {}
+        for term, rows in value_matchers[lang_name].scan(values).items():
+            value_masks[lang_name][term] = np.zeros(n_rows, dtype=bool)
+            value_masks[lang_name][term][rows] = True
+    original = {lang_name: values.copy() for lang_name, values in columns.items()}
+    last_term = {lang_name: np.full(n_rows, None, dtype=object) for lang_name in lang_map.values()}
     
-    corrections_applied = 0
-    
-    # Para cada término en el glosario
     for term, term_data in glossary.items():
         translations = term_data["translations"]
-        
-        # Buscar claves que contienen este término
-        pattern = f"\\b{term}\\b"
-        matching_indices = df[df["Clave"].str.contains(pattern, case=False, regex=True, na=False)].index
-        
-        if len(matching_indices) == 0:
+        key_mask = key_masks.get(term)
+        if key_mask is None:
             continue
         
         print(f"\nProcesando término: {term}")
-        print(f"  Claves encontradas: {len(matching_indices)}")
+        print(f"  Claves encontradas: {int(key_mask.sum())}")
         
-        # Para cada idioma, aplicar la traducción estándar del glosario
         for lang_code, lang_name in lang_map.items():
             if lang_code not in translations:
                 continue
+            values, masks, value_matcher = columns[lang_name], value_masks[lang_name], value_matchers[lang_name]
+            rows = np.flatnonzero(key_mask & masks.get(term, False))
+            if len(rows) == 0:
+                continue
             
+            # Corregir solo el término dentro de cada valor (una vez por valor distinto)
             standard_translation = translations[lang_code]
+            current = values[rows]
+            normalize = value_matcher.normalize
+            fixes = {value: correct_term(value, term, standard_translation, value_matcher, normalize) for value in set(current)}
+            corrected = np.array([fixes[value] for value in current], dtype=object)
+            changed = current != corrected
+            rows, current, corrected = rows[changed], current[changed], corrected[changed]
+            if len(rows) == 0:
+                continue
+            values[rows] = corrected
+            last_term[lang_name][rows] = term
             
-            # Verificar si hay variaciones y corregirlas
-            for idx in matching_indices:
-                current_value = df.loc[idx, lang_name]
-                
-                # Si la traducción actual contiene el término en ese idioma, reemplazarlo
-                if pd.notna(current_value):
-                    current_str = str(current_value)
-                    
-                    # Buscar variaciones del término
-                    # Por ejemplo, si el término es "invoice", buscar "invoices", "Invoice", etc.
-                    term_pattern = f"\\b{term}s?\\b"
-                    
-                    if re.search(term_pattern, current_str, re.IGNORECASE):
-                        # Reemplazar con la traducción estándar
-                        # Mantener mayúsculas/minúsculas del original si es necesario
-                        if current_str[0].isupper():
-                            corrected = standard_translation.capitalize()
-                        else:
-                            corrected = standard_translation
-                        
-                        if current_str != corrected:
-                            df.loc[idx, lang_name] = corrected
-                            corrections_applied += 1
+            # Later terms see the corrected values: only the terms involved change
+            for old_value in set(current):
+                for old_term in value_matcher.terms_in(old_value):
+                    masks[old_term][rows[current == old_value]] = False
+            for new_value in set(corrected):
+                for new_term in value_matcher.terms_in(new_value):
+                    masks.setdefault(new_term, np.zeros(n_rows, dtype=bool))[rows[corrected == new_value]] = True
+    
+    # Bulk column assignment and change-set
+    changes = []
+    for lang_name, values in columns.items():
+        modified = np.flatnonzero(values != original[lang_name])
+        if len(modified) == 0:
+            continue
+        df[lang_name] = pd.Series(values, index=df.index).astype(df[lang_name].dtype)
+        changes.append(pd.DataFrame({
+            "Clave": keys[modified],
+            "Idioma": lang_name,
+            "Término": last_term[lang_name][modified],
+            "Antes": original[lang_name][modified],
+            "Después": values[modified],
+        }, columns=CHANGE_COLUMNS))
+    changes = pd.concat(changes, ignore_index=True) if changes else pd.DataFrame(columns=CHANGE_COLUMNS)
+    return df, changes
+
+def _cell(value):
+    return str(value).replace("|", "\\|").replace("\n", " ")
+
+def apply_terminology_corrections():
+    """
+    Aplica correcciones de coherencia terminológica basadas en el glosario maestro.
+    """
+    
+    # Cargar archivos
+    glossary_path = ROOT_DIR / "glosario_maestro.json"
+    
+    df = load_stage("mejoradas_deepl")
+    
+    with open(glossary_path, "r", encoding="utf-8") as f:
+        glossary = json.load(f)
+    
+    print("Aplicando correcciones de coherencia terminológica...")
+    
+    df, changes = terminology_corrections(df, glossary)
+    corrections_applied = len(changes)
     
     # Guardar archivo corregido
-    output_file = "/home/ubuntu/piano-emotion-manager/TRADUCCIONES_CORREGIDAS_PARA_REVISOR.xlsx"
-    df.to_excel(output_file, index=False)
+    # Etapa para el revisor: se guarda en el almacén y se exporta a xlsx, junto
+    # con los locales de este momento, que serán la base al fusionar lo que devuelva
+    save_stage("corregidas_para_revisor", df)
+    _, locales = load_app_locales({lang_name: lang_code for lang_code, lang_name in LANGUAGE_NAMES.items()})
+    save_stage("locales_exportados", locales)
+    output_file = stage_xlsx_path("corregidas_para_revisor")
     
     print(f"\n✓ Correcciones aplicadas: {corrections_applied}")
     print(f"✓ Archivo guardado: {output_file}")
@@ -93,8 +191,18 @@ def apply_terminology_corrections():
     report.append(f"**Correcciones aplicadas:** {corrections_applied}\n\n")
     report.append("## Términos Corregidos\n\n")
     
+    per_term = changes["Término"].value_counts()
     for term in glossary.keys():
-        report.append(f"- `{term}`\n")
+        report.append(f"- `{term}`: {int(per_term.get(term, 0))} correcciones\n")
+    
+    report.append("\n## Cambios Aplicados\n\n")
+    if len(changes):
+        report.append("| Clave | Idioma | Término | Antes | Después |\n")
+        report.append("|---|---|---|---|---|\n")
+        for change in changes.itertuples(index=False):
+            report.append(f"| `{change.Clave}` | {change.Idioma} | `{change.Término}` | {_cell(change.Antes)} | {_cell(change.Después)} |\n")
+    else:
+        report.append("*No se aplicaron cambios.*\n")
     
     report.append("\n## Instrucciones para la Empresa de Traducciones\n\n")
     report.append("1. Revisar el archivo XLSX adjunto\n")
@@ -103,7 +211,7 @@ def apply_terminology_corrections():
     report.append("4. Hacer correcciones según sea necesario\n")
     report.append("5. Devolver el archivo con cambios marcados\n\n")
     
-    report_file = "/home/ubuntu/piano-emotion-manager/REPORTE_CORRECCIONES_APLICADAS.md"
+    report_file = ROOT_DIR / "REPORTE_CORRECCIONES_APLICADAS.md"
     with open(report_file, "w", encoding="utf-8") as f:
         f.write("\n".join(report))
     
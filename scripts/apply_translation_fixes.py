@@ -1,12 +1,9 @@
 
-import pandas as pd
+from pipeline_store import load_stage, save_stage
 
 def apply_translation_fixes():
-    translations_file = "/home/ubuntu/piano-emotion-manager/TRADUCCIONES_CONSOLIDADAS.xlsx"
-    errors_file = "/home/ubuntu/piano-emotion-manager/TRADUCCIONES_ERRORES.xlsx"
-    
-    df_translations = pd.read_excel(translations_file)
-    df_errors = pd.read_excel(errors_file)
+    df_translations = load_stage("consolidadas")
+    df_errors = load_stage("errores")
     
     # Set Clave as index for easy lookup
     df_translations.set_index("Clave", inplace=True)
@@ -33,8 +30,8 @@ def apply_translation_fixes():
 
     # Save the corrected file
     df_translations.reset_index(inplace=True)
-    df_translations.to_excel("/home/ubuntu/piano-emotion-manager/TRADUCCIONES_CORREGIDAS.xlsx", index=False)
-    print("Se han aplicado las correcciones y mejoras. El archivo corregido se ha guardado en TRADUCCIONES_CORREGIDAS.xlsx")
+    save_stage("corregidas", df_translations)
+    print("Se han aplicado las correcciones y mejoras. El resultado se ha guardado en la etapa 'corregidas'")
 
 if __name__ == "__main__":
     apply_translation_fixes()
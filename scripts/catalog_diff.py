@@ -0,0 +1,116 @@
+
+"""
+Diferencias entre dos versiones de un catálogo (DataFrames con 'Clave' y
+una columna por idioma), alineadas por clave.
+
+La comparación se hace por columnas con operaciones vectorizadas, en
+tiempo lineal en el número de celdas. Un valor ausente (NaN/None) en ambas
+versiones no es un cambio; pasar de ausente a un valor es una celda
+añadida y lo contrario, una celda eliminada. Las claves o los idiomas que
+solo existen en una de las versiones cuentan como celdas añadidas o
+eliminadas.
+"""
+import json
+import numpy as np
+import pandas as pd
+
+DIFF_COLUMNS = ["Clave", "Idioma", "Cambio", "Valor Original", "Valor Corregido"]
+
+# Change kinds in the Markdown report and in the patch
+ADDED, REMOVED, CHANGED = "añadida", "eliminada", "modificada"
+PATCH_OPS = {ADDED: "add", REMOVED: "remove", CHANGED: "replace"}
+
+
+def _aligned(df, key_column, keys, languages):
+    indexed = df.set_index(key_column)
+    if not indexed.index.is_unique:
+        raise ValueError('El diff necesita claves únicas')
+    positions = indexed.index.get_indexer(keys)
+    found = positions >= 0
+    columns = {}
+    for lang in languages:
+        values = np.full(len(keys), None, dtype=object)
+        if lang in indexed.columns:
+            column = indexed[lang].to_numpy(dtype=object)
+            values[found] = column[positions[found]]
+        values[pd.isna(values)] = None
+        columns[lang] = values
+    return columns
+
+
+def catalog_diff(before, after, key_column="Clave"):
+    """
+    Celdas añadidas, eliminadas y modificadas de `before` a `after`.
+
+    Devuelve un DataFrame con DIFF_COLUMNS, en el orden de las claves de
+    `after` (las eliminadas, al final) y de sus idiomas; los valores
+    ausentes son None.
+    """
+    after_keys = pd.Index(after[key_column].to_numpy(dtype=object))
+    before_keys = pd.Index(before[key_column].to_numpy(dtype=object))
+    keys = after_keys.append(before_keys[~before_keys.isin(after_keys)]).to_numpy(dtype=object)
+    languages = [column for column in after.columns if column != key_column]
+    languages += [column for column in before.columns if column != key_column and column not in languages]
+
+    old_columns = _aligned(before, key_column, keys, languages)
+    new_columns = _aligned(after, key_column, keys, languages)
+
+    parts = []
+    for position, lang in enumerate(languages):
+        old, new = old_columns[lang], new_columns[lang]
+        old_present, new_present = pd.notna(old), pd.notna(new)
+        both = old_present & new_present
+        changed = np.zeros(len(keys), dtype=bool)
+        changed[both] = old[both] != new[both]
+        kinds = np.select(
+            [new_present & ~old_present, old_present & ~new_present, changed],
+            [ADDED, REMOVED, CHANGED],
+            default="",
+        )
+        rows = np.flatnonzero(kinds != "")
+        if len(rows) == 0:
+            continue
+        parts.append((rows, position, pd.DataFrame({
+            "Clave": keys[rows],
+            "Idioma": lang,
+            "Cambio": kinds[rows],
+            "Valor Original": pd.Series(old[rows], dtype=object),
+            "Valor Corregido": pd.Series(new[rows], dtype=object),
+        }, columns=DIFF_COLUMNS)))
+
+    if not parts:
+        return pd.DataFrame(columns=DIFF_COLUMNS)
+    # Row-major order: by key, then by language
+    key_order = np.concatenate([rows for rows, _, _ in parts])
+    lang_order = np.concatenate([np.full(len(rows), position) for rows, position, _ in parts])
+    diff = pd.concat([part for _, _, part in parts], ignore_index=True)
+    return diff.iloc[np.lexsort((lang_order, key_order))].reset_index(drop=True)
+
+
+def diff_counts(diff):
+    """
+    {tipo de cambio: número de celdas}, con los tres tipos.
+    """
+    counts = diff["Cambio"].value_counts()
+    return {kind: int(counts.get(kind, 0)) for kind in (ADDED, REMOVED, CHANGED)}
+
+
+def diff_to_patch(diff, base=None, target=None):
+    """
+    Parche legible por máquina: una operación por celda
+    ({"op": "add" | "remove" | "replace", "key", "lang", "old", "new"}).
+    """
+    return {
+        "base": base,
+        "target": target,
+        "counts": {PATCH_OPS[kind]: count for kind, count in diff_counts(diff).items()},
+        "changes": [
+            {"op": PATCH_OPS[kind], "key": key, "lang": lang, "old": old, "new": new}
+            for key, lang, kind, old, new in diff[DIFF_COLUMNS].itertuples(index=False, name=None)
+        ],
+    }
+
+
+def write_patch(diff, path, base=None, target=None):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(diff_to_patch(diff, base, target), f, ensure_ascii=False, indent=2)
@@ -0,0 +1,122 @@
+
+"""
+Fusión a tres bandas de catálogos (DataFrames con 'Clave' y una columna
+por idioma), alineados por clave.
+
+- base: el catálogo del repositorio en el momento de exportar.
+- proveedor: la copia que devuelve el proveedor, es decir, la exportación
+  (con las correcciones del pipeline) más sus ediciones.
+- actual: el catálogo del repositorio, que puede haber cambiado mientras.
+
+Las filas se comparan primero por un hash de fila: solo las que cambian en
+la copia del proveedor respecto de la base se resuelven celda a celda, y
+esa resolución también es vectorizada. Una celda toma el valor del
+proveedor si solo ese lado la ha cambiado, conserva el actual si solo ha
+cambiado en el repositorio y es un conflicto si ambos la han cambiado de
+forma distinta; los conflictos conservan el valor actual hasta resolverlos.
+Una celda vacía (NaN, None o '') equivale a una celda ausente; las claves
+y los idiomas que faltan en la copia del proveedor no se tocan.
+"""
+import numpy as np
+import pandas as pd
+
+CONFLICT_COLUMNS = ["Clave", "Idioma", "Base", "Proveedor", "Actual"]
+
+
+def _align(df, key_column, keys, languages):
+    indexed = df.set_index(key_column)
+    if not indexed.index.is_unique:
+        raise ValueError('La fusión necesita claves únicas')
+    aligned = indexed.reindex(index=keys, columns=languages).astype(object)
+    values = aligned.to_numpy(dtype=object)
+    values[pd.isna(values) | (values == "")] = None
+    return values
+
+
+def _row_hashes(values):
+    return pd.util.hash_pandas_object(pd.DataFrame(values), index=False).to_numpy()
+
+
+def _same(left, right):
+    # NaN-aware equality of object arrays: absent on both sides counts as equal
+    left_absent, right_absent = pd.isna(left), pd.isna(right)
+    both = ~left_absent & ~right_absent
+    equal = left_absent & right_absent
+    equal[both] = left[both] == right[both]
+    return equal
+
+
+class MergeResult:
+    """
+    Resultado de la fusión: catálogo fusionado, celdas tomadas del
+    proveedor y conflictos.
+    """
+
+    def __init__(self, merged, applied, conflicts, rows_changed):
+        self.merged = merged
+        self.applied = applied
+        self.conflicts = conflicts
+        self.rows_changed = rows_changed
+
+
+def changed_rows(before, after, key_column="Clave", languages=None):
+    """
+    Número de claves de `after` cuya fila difiere de la de `before`.
+    """
+    if languages is None:
+        languages = [column for column in after.columns if column != key_column]
+    keys = after[key_column].to_numpy(dtype=object)
+    before_values = _align(before, key_column, keys, languages)
+    after_values = _align(after, key_column, keys, languages)
+    return int((_row_hashes(after_values) != _row_hashes(before_values)).sum())
+
+
+def three_way_merge(base, vendor, current, key_column="Clave", languages=None):
+    """
+    Fusiona los cambios de `vendor` (respecto de `base`) en `current`.
+
+    Devuelve un MergeResult: `merged` sigue el orden de claves de `current`,
+    con las claves nuevas del proveedor al final, y omite las claves que
+    quedan vacías en todos los idiomas; `applied` y `conflicts` son
+    DataFrames (Clave, Idioma, ...).
+    """
+    if languages is None:
+        languages = [column for column in vendor.columns if column != key_column]
+    current_keys = pd.Index(current[key_column].to_numpy(dtype=object))
+    vendor_keys = pd.Index(vendor[key_column].to_numpy(dtype=object))
+    base_keys = pd.Index(base[key_column].to_numpy(dtype=object))
+    keys = current_keys.append(vendor_keys[~vendor_keys.isin(current_keys)])
+    keys = keys.append(base_keys[~base_keys.isin(keys)]).to_numpy(dtype=object)
+
+    base_values = _align(base, key_column, keys, languages)
+    vendor_values = _align(vendor, key_column, keys, languages)
+    merged = _align(current, key_column, keys, languages)
+
+    # Keys or languages the vendor copy does not have count as unchanged, not as deleted
+    untouched_rows = ~pd.Index(keys).isin(vendor_keys)
+    vendor_values[untouched_rows] = base_values[untouched_rows]
+    untouched_columns = [i for i, lang in enumerate(languages) if lang not in vendor.columns]
+    vendor_values[:, untouched_columns] = base_values[:, untouched_columns]
+
+    # Only rows that changed on the vendor side need a cell-level merge
+    rows = np.flatnonzero(_row_hashes(vendor_values) != _row_hashes(base_values))
+    base_rows, vendor_rows, current_rows = base_values[rows], vendor_values[rows], merged[rows]
+    vendor_changed = ~_same(vendor_rows, base_rows)
+    current_changed = ~_same(current_rows, base_rows)
+    take_vendor = vendor_changed & ~current_changed
+    conflict = vendor_changed & current_changed & ~_same(vendor_rows, current_rows)
+    merged[rows] = np.where(take_vendor, vendor_rows, current_rows)
+
+    def cells(mask, **columns):
+        row_idx, col_idx = np.nonzero(mask)
+        frame = {"Clave": keys[rows[row_idx]], "Idioma": np.asarray(languages, dtype=object)[col_idx]}
+        frame.update({name: pd.Series(values[row_idx, col_idx], dtype=object) for name, values in columns.items()})
+        return pd.DataFrame(frame)
+
+    applied = cells(take_vendor & ~_same(vendor_rows, current_rows), Antes=current_rows, Después=vendor_rows)
+    conflicts = cells(conflict, Base=base_rows, Proveedor=vendor_rows, Actual=current_rows)
+
+    keep = pd.notna(merged).any(axis=1)
+    merged_df = pd.DataFrame(merged[keep], columns=languages, dtype=object)
+    merged_df.insert(0, key_column, keys[keep])
+    return MergeResult(merged_df, applied, conflicts[CONFLICT_COLUMNS], len(rows))
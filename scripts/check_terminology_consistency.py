@@ -1,7 +1,9 @@
 
-import pandas as pd
 from collections import defaultdict
-import re
+from translation_catalog import LANGUAGE_NAMES, ROOT_DIR, TranslationCatalog
+from pipeline_store import load_stage
+from qa_rules import QAEngine, key_term_rules
+from qa_store import IncrementalQA
 
 def check_terminology_consistency():
     """
@@ -9,8 +11,7 @@ def check_terminology_consistency():
     Identifica términos que se traducen de múltiples formas diferentes.
     """
     
-    file_path = "/home/ubuntu/piano-emotion-manager/TRADUCCIONES_MEJORADAS_DEEPL.xlsx"
-    df = pd.read_excel(file_path)
+    df = load_stage("mejoradas_deepl")
     
     # Definir términos clave a verificar (en español)
     key_terms = {
@@ -41,20 +42,35 @@ def check_terminology_consistency():
         "dirección": ["address", "Adresse", "adresse", "indirizzo", "endereço", "adresse", "adresse", "adress"],
     }
     
+    # Palabras clave técnicas
+    technical_keywords = {
+        "invoice": ["invoices", "invoice", "factura"],
+        "appointment": ["appointments", "appointment", "cita"],
+        "piano": ["piano", "pianos"],
+        "client": ["client", "clients", "cliente"],
+        "tuning": ["tuning", "afinación"],
+        "maintenance": ["maintenance", "mantenimiento"],
+    }
+
+    # Una sola pasada sobre las claves para todos los términos y palabras clave
+    rules = key_term_rules(key_terms, "termino") + key_term_rules(technical_keywords, "palabra")
+    qa = IncrementalQA(QAEngine(rules), "coherencia")
+    result = qa.run(df)
+    
     # Crear un diccionario para almacenar variaciones de traducción
     terminology_variations = defaultdict(lambda: defaultdict(set))
     
-    # Analizar cada fila del dataframe
-    for index, row in df.iterrows():
-        clave = row["Clave"]
-        
-        # Buscar términos clave en la clave
-        for spanish_term in key_terms.keys():
-            if spanish_term.lower() in clave.lower():
-                # Registrar todas las traducciones de este término
-                for lang in ["Danés", "Alemán", "Inglés", "Español", "Francés", "Italiano", "Noruego", "Portugués", "Sueco"]:
-                    if lang in row and pd.notna(row[lang]):
-                        terminology_variations[spanish_term][lang].add(str(row[lang]))
+    # Registrar todas las traducciones de cada término encontrado en las claves
+    catalog = TranslationCatalog.from_frame(df)
+    columns = [(LANGUAGE_NAMES[lang], catalog.columns[lang]) for lang in catalog.languages if lang in LANGUAGE_NAMES]
+    
+    for spanish_term in key_terms:
+        # The rule masks follow the frame's rows: look each matched key up in the catalog by key
+        for key in dict.fromkeys(result.matrix.keys[result.rows(f"termino:{spanish_term}")]):
+            slot = catalog.slot(str(key))
+            for lang, column in columns:
+                if column[slot] is not None:
+                    terminology_variations[spanish_term][lang].add(str(column[slot]))
     
     # Generar reporte de inconsistencias
     report = []
@@ -90,21 +106,11 @@ def check_terminology_consistency():
     # Análisis de palabras clave por contexto
     report.append("## Análisis de Palabras Clave por Contexto\n\n")
     
-    # Palabras clave técnicas
-    technical_keywords = {
-        "invoice": ["invoices", "invoice", "factura"],
-        "appointment": ["appointments", "appointment", "cita"],
-        "piano": ["piano", "pianos"],
-        "client": ["client", "clients", "cliente"],
-        "tuning": ["tuning", "afinación"],
-        "maintenance": ["maintenance", "mantenimiento"],
-    }
-    
     for keyword, related_terms in technical_keywords.items():
         report.append(f"### Palabra Clave: `{keyword}`\n")
         
         # Buscar todas las claves que contienen esta palabra
-        matching_keys = df[df["Clave"].str.contains(keyword, case=False, na=False)]
+        matching_keys = df[result.rows(f"palabra:{keyword}")]
         
         if len(matching_keys) > 0:
             report.append(f"**Encontradas {len(matching_keys)} claves relacionadas**\n\n")
@@ -119,13 +125,16 @@ def check_terminology_consistency():
         report.append("\n")
     
     # Guardar reporte
-    output_file = "/home/ubuntu/piano-emotion-manager/REPORTE_COHERENCIA_TERMINOLOGICA.md"
+    output_file = ROOT_DIR / "REPORTE_COHERENCIA_TERMINOLOGICA.md"
     with open(output_file, "w", encoding="utf-8") as f:
         f.write("\n".join(report))
     
     print(f"Reporte de coherencia terminológica generado: {output_file}")
     print(f"Inconsistencias encontradas: {inconsistency_count}")
     
+    print(qa.summary())
+    print(result.format_stats())
+    
     return terminology_variations
 
 if __name__ == "__main__":
@@ -0,0 +1,377 @@
+
+"""
+Catálogo binario compilado de traducciones.
+
+Formato (little-endian, versión FORMAT_VERSION):
+
+    cabecera      MAGIC, versión, reservado (0), n_idiomas, n_namespaces, n_claves,
+                  huella de los archivos de origen (SHA-256)
+    idiomas       n_idiomas × (offset, longitud) en el pool
+    namespaces    n_namespaces × (offset, longitud, primera_clave, n_claves, máscara_idiomas)
+    claves        n_claves × (offset, longitud), ordenadas por bytes UTF-8 dentro de cada namespace
+    valores       n_claves × n_idiomas × (offset, longitud); MISSING si no hay traducción
+    pool          cadenas UTF-8 concatenadas (deduplicadas)
+
+El archivo se abre con mmap y las búsquedas son binarias sobre el índice de
+claves, sin parsear JSON ni materializar el catálogo completo.
+
+La huella cubre la ruta relativa, el tamaño y la fecha de cada archivo de
+origen: un archivo nuevo, modificado, borrado o renombrado deja el catálogo
+obsoleto.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+from translation_catalog import (
+    BASE_LANG,
+    CACHE_DIR,
+    LOCALES_DIR,
+    TranslationCatalog,
+    list_languages,
+    load_flat_json,
+    load_locale,
+)
+
+
+MAGIC = b'PEMCAT\x00\x00'
+FORMAT_VERSION = 2
+MISSING = 0xFFFFFFFF
+
+HEADER = struct.Struct('<8sHHIII32s')
+STRING_REF = struct.Struct('<II')
+NAMESPACE_ENTRY = struct.Struct('<IIIIQ')
+
+COMPILED_CATALOG_PATH = CACHE_DIR / 'translations.catalog'
+NAMESPACES = ('translations', 'legal', 'einvoicing')
+
+
+def load_namespace(namespace, locales_dir=LOCALES_DIR):
+    """
+    Devuelve {idioma: diccionario plano} para un namespace.
+
+    'einvoicing' vive en un único `locales/einvoicing.json` con un bloque por
+    idioma; el resto son `locales/<lang>/<namespace>.json`.
+    """
+    locales_dir = Path(locales_dir)
+    if namespace == 'einvoicing':
+        source = locales_dir / 'einvoicing.json'
+        if not source.exists():
+            return {}
+        flat_by_lang = {}
+        for key, value in load_flat_json(source).items():
+            lang, _, lang_key = key.partition('.')
+            flat_by_lang.setdefault(lang, {})[lang_key] = value
+        return flat_by_lang
+    flat_by_lang = {}
+    for lang in list_languages(locales_dir):
+        flat = load_locale(lang, locales_dir, namespace)
+        if flat is not None:
+            flat_by_lang[lang] = flat
+    return flat_by_lang
+
+
+def source_files(locales_dir=LOCALES_DIR):
+    locales_dir = Path(locales_dir)
+    files = [locales_dir / 'einvoicing.json']
+    for lang in list_languages(locales_dir):
+        files.extend(locales_dir / lang / f'{namespace}.json' for namespace in NAMESPACES if namespace != 'einvoicing')
+    return sorted(path for path in files if path.exists())
+
+
+def sources_fingerprint(locales_dir=LOCALES_DIR):
+    """
+    SHA-256 de la lista de archivos de origen con su tamaño y fecha.
+    """
+    locales_dir = Path(locales_dir)
+    digest = hashlib.sha256()
+    for source in source_files(locales_dir):
+        stat = source.stat()
+        digest.update(f'{source.relative_to(locales_dir).as_posix()}\0{stat.st_size}\0{stat.st_mtime_ns}\n'.encode('utf-8'))
+    return digest.digest()
+
+
+def compile_catalog(locales_dir=LOCALES_DIR, output_path=COMPILED_CATALOG_PATH):
+    """
+    Compila todos los namespaces de `locales_dir` en un único archivo binario.
+    """
+    # Taken before reading, so a file changed while compiling leaves the catalog stale
+    fingerprint = sources_fingerprint(locales_dir)
+    namespaces = [(namespace, load_namespace(namespace, locales_dir)) for namespace in NAMESPACES]
+    languages = sorted({lang for _, flat_by_lang in namespaces for lang in flat_by_lang})
+    if len(languages) > 64:
+        raise ValueError(f'El formato admite como máximo 64 idiomas ({len(languages)} encontrados)')
+
+    pool = bytearray()
+    pool_index = {}
+
+    def intern(text):
+        ref = pool_index.get(text)
+        if ref is None:
+            data = text.encode('utf-8')
+            ref = (len(pool), len(data))
+            pool.extend(data)
+            pool_index[text] = ref
+        return ref
+
+    lang_refs = [intern(lang) for lang in languages]
+    namespace_entries = []
+    key_refs = []
+    value_refs = []
+    for namespace, flat_by_lang in namespaces:
+        keys = sorted({key for flat in flat_by_lang.values() for key in flat}, key=lambda k: k.encode('utf-8'))
+        mask = 0
+        for i, lang in enumerate(languages):
+            if lang in flat_by_lang:
+                mask |= 1 << i
+        name_off, name_len = intern(namespace)
+        namespace_entries.append((name_off, name_len, len(key_refs), len(keys), mask))
+        columns = [flat_by_lang.get(lang) for lang in languages]
+        for key in keys:
+            key_refs.append(intern(key))
+            for flat in columns:
+                value = None if flat is None else flat.get(key)
+                value_refs.append((MISSING, 0) if value is None else intern(str(value)))
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_suffix(f'{output_path.suffix}.{os.getpid()}.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(languages), len(namespace_entries), len(key_refs), fingerprint))
+        for ref in lang_refs:
+            f.write(STRING_REF.pack(*ref))
+        for entry in namespace_entries:
+            f.write(NAMESPACE_ENTRY.pack(*entry))
+        for ref in key_refs:
+            f.write(STRING_REF.pack(*ref))
+        for ref in value_refs:
+            f.write(STRING_REF.pack(*ref))
+        f.write(pool)
+    tmp_path.replace(output_path)
+    return output_path
+
+
+class CompiledRow:
+    """
+    Vista de una clave del catálogo compilado; mismo contrato que CatalogRow.
+    """
+
+    __slots__ = ('view', 'slot')
+
+    def __init__(self, view, slot):
+        self.view = view
+        self.slot = slot
+
+    @property
+    def key(self):
+        return self.view.key_at(self.slot)
+
+    def __getitem__(self, lang):
+        return self.view.value_at(self.slot, lang)
+
+    def get(self, lang, default=None):
+        value = self.view.value_at(self.slot, lang)
+        return default if value is None else value
+
+    def values(self, languages=None):
+        languages = self.view.languages if languages is None else languages
+        return [self[lang] for lang in languages]
+
+
+class CompiledNamespace:
+    """
+    Un namespace del catálogo compilado, con la misma interfaz de lectura
+    que TranslationCatalog (languages, has_language, keys, get, rows).
+    """
+
+    def __init__(self, catalog, name, first_key, key_count, mask):
+        self.catalog = catalog
+        self.name = name
+        self.first_key = first_key
+        self.key_count = key_count
+        self.languages = [lang for i, lang in enumerate(catalog.languages) if mask >> i & 1]
+
+    def __len__(self):
+        return self.key_count
+
+    def has_language(self, lang):
+        return lang in self.languages
+
+    def key_at(self, slot):
+        return self.catalog.key_string(self.first_key + slot)
+
+    def value_at(self, slot, lang):
+        lang_index = self.catalog.lang_index.get(lang)
+        if lang_index is None:
+            return None
+        return self.catalog.value_string(self.first_key + slot, lang_index)
+
+    def slot(self, key):
+        target = key.encode('utf-8')
+        lo, hi = 0, self.key_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.catalog.key_bytes(self.first_key + mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.key_count and self.catalog.key_bytes(self.first_key + lo) == target:
+            return lo
+        return None
+
+    def row(self, key):
+        slot = self.slot(key)
+        return None if slot is None else CompiledRow(self, slot)
+
+    def get(self, key, lang, default=None):
+        slot = self.slot(key)
+        value = None if slot is None else self.value_at(slot, lang)
+        return default if value is None else value
+
+    def keys(self, lang=BASE_LANG):
+        return [row.key for row in self.rows(lang)]
+
+    def rows(self, base_lang=BASE_LANG):
+        """
+        Recorre en orden de clave las filas presentes en el idioma base
+        (todas las claves si `base_lang` es None).
+        """
+        if base_lang is None:
+            for slot in range(self.key_count):
+                yield CompiledRow(self, slot)
+            return
+        lang_index = self.catalog.lang_index.get(base_lang)
+        if lang_index is None:
+            return
+        for slot in range(self.key_count):
+            if self.catalog.has_value(self.first_key + slot, lang_index):
+                yield CompiledRow(self, slot)
+
+    def to_catalog(self):
+        """
+        Materializa el namespace como TranslationCatalog en memoria.
+        """
+        catalog = TranslationCatalog()
+        for lang in self.languages:
+            catalog.add_language(lang, {
+                self.key_at(slot): value
+                for slot in range(self.key_count)
+                if (value := self.value_at(slot, lang)) is not None
+            })
+        return catalog
+
+
+class CompiledCatalog:
+    """
+    Lector de un catálogo compilado abierto con mmap.
+    """
+
+    def __init__(self, path=COMPILED_CATALOG_PATH):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = self._mmap
+        try:
+            magic, version, _, n_langs, n_namespaces, n_keys, self.fingerprint = HEADER.unpack_from(buf, 0)
+            if magic != MAGIC:
+                raise ValueError(f'{self.path} no es un catálogo compilado')
+            if version != FORMAT_VERSION:
+                raise ValueError(f'{self.path}: versión de formato {version} no soportada (se esperaba {FORMAT_VERSION})')
+        except (ValueError, struct.error):
+            buf.close()
+            raise
+
+        self.n_langs = n_langs
+        self.n_keys = n_keys
+        self._langs_offset = HEADER.size
+        self._namespaces_offset = self._langs_offset + n_langs * STRING_REF.size
+        self._keys_offset = self._namespaces_offset + n_namespaces * NAMESPACE_ENTRY.size
+        self._values_offset = self._keys_offset + n_keys * STRING_REF.size
+        self._pool_offset = self._values_offset + n_keys * n_langs * STRING_REF.size
+
+        self.languages = [
+            self._string(*STRING_REF.unpack_from(buf, self._langs_offset + i * STRING_REF.size))
+            for i in range(n_langs)
+        ]
+        self.lang_index = {lang: i for i, lang in enumerate(self.languages)}
+        self.namespaces = {}
+        for i in range(n_namespaces):
+            name_off, name_len, first_key, key_count, mask = NAMESPACE_ENTRY.unpack_from(
+                buf, self._namespaces_offset + i * NAMESPACE_ENTRY.size
+            )
+            name = self._string(name_off, name_len)
+            self.namespaces[name] = CompiledNamespace(self, name, first_key, key_count, mask)
+
+    def close(self):
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _bytes(self, offset, length):
+        start = self._pool_offset + offset
+        return self._mmap[start:start + length]
+
+    def _string(self, offset, length):
+        return self._bytes(offset, length).decode('utf-8')
+
+    def key_bytes(self, index):
+        return self._bytes(*STRING_REF.unpack_from(self._mmap, self._keys_offset + index * STRING_REF.size))
+
+    def key_string(self, index):
+        return sys.intern(self.key_bytes(index).decode('utf-8'))
+
+    def _value_ref(self, index, lang_index):
+        return STRING_REF.unpack_from(self._mmap, self._values_offset + (index * self.n_langs + lang_index) * STRING_REF.size)
+
+    def has_value(self, index, lang_index):
+        return self._value_ref(index, lang_index)[0] != MISSING
+
+    def value_string(self, index, lang_index):
+        offset, length = self._value_ref(index, lang_index)
+        if offset == MISSING:
+            return None
+        return self._string(offset, length)
+
+    def view(self, namespace='translations'):
+        return self.namespaces[namespace]
+
+
+def is_stale(path=COMPILED_CATALOG_PATH, locales_dir=LOCALES_DIR):
+    """
+    True si el catálogo no existe, es de otra versión o su huella no
+    coincide con los archivos de origen actuales.
+    """
+    path = Path(path)
+    if not path.exists():
+        return True
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return True
+    magic, version, *_, fingerprint = HEADER.unpack(header)
+    return magic != MAGIC or version != FORMAT_VERSION or fingerprint != sources_fingerprint(locales_dir)
+
+
+def open_compiled_catalog(path=COMPILED_CATALOG_PATH, locales_dir=LOCALES_DIR):
+    """
+    Abre el catálogo compilado, recompilándolo si los archivos de origen
+    cambiaron. Se cierra con close() o usándolo en un bloque with.
+    """
+    if is_stale(path, locales_dir):
+        compile_catalog(locales_dir, path)
+    return CompiledCatalog(path)
+
+
+if __name__ == '__main__':
+    output = compile_catalog()
+    with CompiledCatalog(output) as compiled:
+        print(f'Catálogo compilado: {output}')
+        print(f'Idiomas: {", ".join(compiled.languages)}')
+        for name, view in compiled.namespaces.items():
+            print(f'  {name}: {len(view)} claves')
@@ -1,7 +1,9 @@
 
-import pandas as pd
-from collections import defaultdict
-import re
+from pipeline_store import load_stage
+from term_index import TermIndex
+from term_matcher import TermMatcher
+from term_normalizer import normalizer
+from translation_catalog import ROOT_DIR
 
 def detailed_terminology_analysis():
     """
@@ -9,8 +11,7 @@ def detailed_terminology_analysis():
     Identifica variaciones de traducción para cada término clave.
     """
     
-    file_path = "/home/ubuntu/piano-emotion-manager/TRADUCCIONES_MEJORADAS_DEEPL.xlsx"
-    df = pd.read_excel(file_path)
+    df = load_stage("mejoradas_deepl")
     
     languages = ["Danés", "Alemán", "Inglés", "Español", "Francés", "Italiano", "Noruego", "Portugués", "Sueco"]
     
@@ -93,12 +94,16 @@ def detailed_terminology_analysis():
     # Análisis por término
     total_issues = 0
     
+    # Claves de todos los términos en una sola pasada, sobre palabras normalizadas
+    # ('invoices.list' cuenta para 'invoice')
+    matcher = TermMatcher(list(key_terms_analysis), whole_words=True, normalize=normalizer("en"))
+    rows_by_term = matcher.scan(df["Clave"].to_numpy(dtype=object))
+    
     for term, translations in key_terms_analysis.items():
         report.append(f"## Término: `{term}`\n\n")
         
-        # Buscar claves que contienen este término
-        pattern = f"\\b{term}\\b"
-        matching_rows = df[df["Clave"].str.contains(pattern, case=False, regex=True, na=False)]
+        # Claves que contienen este término
+        matching_rows = df.iloc[rows_by_term.get(term, [])]
         
         if len(matching_rows) == 0:
             report.append("*No se encontraron claves con este término.*\n\n")
@@ -135,22 +140,15 @@ def detailed_terminology_analysis():
     # Análisis de variaciones por idioma
     report.append("## Análisis de Variaciones por Idioma\n\n")
     
+    # Índice de palabras por idioma (solo se reindexan las celdas que cambiaron)
+    index = TermIndex("mejoradas_deepl")
+    index.update(df)
+    
     for lang in languages:
         report.append(f"### {lang}\n\n")
         
-        # Contar palabras más frecuentes
-        all_text = " ".join(df[lang].astype(str).values)
-        words = all_text.lower().split()
-        word_freq = defaultdict(int)
-        
-        for word in words:
-            # Limpiar puntuación
-            word = re.sub(r'[^\w\s]', '', word)
-            if len(word) > 4:  # Solo palabras de más de 4 caracteres
-                word_freq[word] += 1
-        
-        # Mostrar palabras más frecuentes
-        top_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:10]
+        # Mostrar palabras más frecuentes (solo palabras de más de 4 caracteres)
+        top_words = index.top_tokens(lang, limit=10, min_length=5)
         report.append("**Palabras más frecuentes:**\n\n")
         for word, freq in top_words:
             report.append(f"- `{word}`: {freq} ocurrencias\n")
@@ -166,7 +164,7 @@ def detailed_terminology_analysis():
     report.append("5. **Documentación:** Mantener un documento de decisiones de traducción.\n\n")
     
     # Guardar reporte
-    output_file = "/home/ubuntu/piano-emotion-manager/ANALISIS_DETALLADO_TERMINOLOGIA.md"
+    output_file = ROOT_DIR / "ANALISIS_DETALLADO_TERMINOLOGIA.md"
     with open(output_file, "w", encoding="utf-8") as f:
         f.write("\n".join(report))
     
@@ -1,43 +1,39 @@
+from pipeline_store import load_stage
+from catalog_diff import ADDED, REMOVED, CHANGED, catalog_diff, diff_counts, write_patch
+from translation_catalog import ROOT_DIR
 
-import pandas as pd
+def _cell(value):
+    if value is None:
+        return ""
+    return "`" + str(value).replace("|", "\\|").replace("\n", " ") + "`"
 
 def generate_change_report():
-    original_file = "/home/ubuntu/piano-emotion-manager/TRADUCCIONES_CONSOLIDADAS.xlsx"
-    corrected_file = "/home/ubuntu/piano-emotion-manager/TRADUCCIONES_CORREGIDAS.xlsx"
-    
-    df_original = pd.read_excel(original_file)
-    df_corrected = pd.read_excel(corrected_file)
-    
-    # Set Clave as index
-    df_original.set_index("Clave", inplace=True)
-    df_corrected.set_index("Clave", inplace=True)
-    
-    # Find differences
-    changes = []
-    for index, row in df_corrected.iterrows():
-        for col in df_corrected.columns:
-            if row[col] != df_original.loc[index, col]:
-                changes.append({
-                    "Clave": index,
-                    "Idioma": col,
-                    "Valor Original": df_original.loc[index, col],
-                    "Valor Corregido": row[col]
-                })
-    
+    df_original = load_stage("consolidadas")
+    df_corrected = load_stage("corregidas")
+
+    # Key-aligned diff of both stages (NaN in both is not a change)
+    changes = catalog_diff(df_original, df_corrected)
+    counts = diff_counts(changes)
+
     # Save report to markdown file
     report = []
     report.append("# Reporte de Cambios en Traducciones\n")
     report.append("Este documento detalla todos los cambios realizados en el archivo de traducciones.\n")
-    report.append("| Clave | Idioma | Valor Original | Valor Corregido |")
-    report.append("|---|---|---|---|")
-    
-    for change in changes:
-        report.append(f"| `{change['Clave']}` | {change['Idioma']} | `{change['Valor Original']}` | `{change['Valor Corregido']}` |")
-        
-    with open("/home/ubuntu/piano-emotion-manager/REPORTE_CAMBIOS_TRADUCCIONES.md", "w", encoding="utf-8") as f:
+    report.append(f"**Celdas modificadas:** {counts[CHANGED]} · **añadidas:** {counts[ADDED]} · **eliminadas:** {counts[REMOVED]}\n")
+    report.append("| Clave | Idioma | Cambio | Valor Original | Valor Corregido |")
+    report.append("|---|---|---|---|---|")
+
+    for clave, idioma, cambio, original, corregido in changes.itertuples(index=False, name=None):
+        report.append(f"| `{clave}` | {idioma} | {cambio} | {_cell(original)} | {_cell(corregido)} |")
+
+    with open(ROOT_DIR / "REPORTE_CAMBIOS_TRADUCCIONES.md", "w", encoding="utf-8") as f:
         f.write("\n".join(report))
-        
+
+    # Machine-readable patch with the same changes
+    write_patch(changes, ROOT_DIR / "REPORTE_CAMBIOS_TRADUCCIONES.json", "consolidadas", "corregidas")
+
     print("Reporte de cambios generado: REPORTE_CAMBIOS_TRADUCCIONES.md")
+    print("Parche de cambios generado: REPORTE_CAMBIOS_TRADUCCIONES.json")
 
 if __name__ == "__main__":
     generate_change_report()
@@ -1,15 +1,16 @@
 
-import pandas as pd
 import json
 from collections import defaultdict
+from pipeline_store import load_stage
+from term_index import TermIndex
+from translation_catalog import ROOT_DIR
 
 def generate_master_glossary():
     """
     Genera un glosario maestro con traducciones estándar para términos clave.
     """
     
-    file_path = "/home/ubuntu/piano-emotion-manager/TRADUCCIONES_MEJORADAS_DEEPL.xlsx"
-    df = pd.read_excel(file_path)
+    df = load_stage("mejoradas_deepl")
     
     languages = ["Danés", "Alemán", "Inglés", "Español", "Francés", "Italiano", "Noruego", "Portugués", "Sueco"]
     
@@ -193,6 +194,11 @@ def generate_master_glossary():
         }
     }
     
+    # Índice de palabras normalizadas del catálogo: cuántas claves usan cada
+    # traducción estándar, también en plural o con otra flexión
+    index = TermIndex("mejoradas_deepl:lemas", stemming=True)
+    index.update(df)
+    
     # Generar reporte en Markdown
     report = []
     report.append("# Glosario Maestro de Términos Clave\n\n")
@@ -212,8 +218,8 @@ def generate_master_glossary():
             report.append(f"### `{term}`\n\n")
             report.append(f"**Contexto:** {data['context']}\n\n")
             report.append("**Traducciones:**\n\n")
-            report.append("| Idioma | Traducción |\n")
-            report.append("|---|---|\n")
+            report.append("| Idioma | Traducción | Claves que la usan |\n")
+            report.append("|---|---|---|\n")
             
             lang_map = {
                 "es": "Español",
@@ -229,7 +235,8 @@ def generate_master_glossary():
             
             for lang_code, lang_name in sorted(lang_map.items()):
                 translation = data["translations"].get(lang_code, "N/A")
-                report.append(f"| {lang_name} | `{translation}` |\n")
+                usage = len(index.keys_with(lang_name, translation)) if lang_code in data["translations"] else 0
+                report.append(f"| {lang_name} | `{translation}` | {usage} |\n")
             
             report.append(f"\n**Notas:** {data['notes']}\n\n")
     
@@ -244,8 +251,8 @@ def generate_master_glossary():
         }
     
     # Guardar archivos
-    md_file = "/home/ubuntu/piano-emotion-manager/GLOSARIO_MAESTRO_TERMINOS.md"
-    json_file = "/home/ubuntu/piano-emotion-manager/glosario_maestro.json"
+    md_file = ROOT_DIR / "GLOSARIO_MAESTRO_TERMINOS.md"
+    json_file = ROOT_DIR / "glosario_maestro.json"
     
     with open(md_file, "w", encoding="utf-8") as f:
         f.write("\n".join(report))
@@ -1,85 +1,73 @@
 
-import json
-import os
-from pathlib import Path
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from compiled_catalog import CompiledCatalog, open_compiled_catalog
+from review_documents import ReviewView, render_review_documents
+from translation_catalog import LANGUAGE_NAMES, LOCALES_DIR
 
-def generate_translation_reviews_all_languages():
-    locales_dir = Path(__file__).parent.parent / 'locales'
-    
-    # Get all languages
-    all_languages = [d for d in os.listdir(locales_dir) if os.path.isdir(locales_dir / d)]
-    
-    # Language names
-    language_names = {
-        'da': 'Danés',
-        'de': 'Alemán',
-        'en': 'Inglés',
-        'es': 'Español',
-        'fr': 'Francés',
-        'it': 'Italiano',
-        'no': 'Noruego',
-        'pt': 'Portugués',
-        'sv': 'Sueco'
-    }
-    
-    def flatten_dict(d, parent_key='', sep='.'):
-        items = []
-        for k, v in d.items():
-            new_key = f"{parent_key}{sep}{k}" if parent_key else k
-            if isinstance(v, dict):
-                items.extend(flatten_dict(v, new_key, sep=sep).items())
-            else:
-                items.append((new_key, v))
-        return dict(items)
-    
-    # For each language, create a document
-    for base_lang in all_languages:
-        print(f'Generating review document for {base_lang}...')
-        
-        # Load base language translations
-        with open(locales_dir / base_lang / 'translations.json', 'r', encoding='utf-8') as f:
-            base_translations = json.load(f)
-        
-        # Get other languages
-        other_languages = [lang for lang in all_languages if lang != base_lang]
+def review_views(languages, output_dir):
+    """
+    Una vista de revisión por idioma base.
+    """
+    views = []
+    for base_lang in languages:
+        base_name = LANGUAGE_NAMES.get(base_lang, base_lang)
         
-        # Create markdown document
-        doc = []
-        doc.append(f'# Documento de Revisión de Traducciones - {language_names.get(base_lang, base_lang)}\n')
-        doc.append('## Instrucciones para la Empresa de Traducciones\n')
-        doc.append(f'Este documento contiene todas las claves de traducción en {language_names.get(base_lang, base_lang)} (idioma base) y sus equivalentes en otros idiomas.')
-        doc.append('Por favor, revise cada traducción y corrija cualquier error o inconsistencia.\n')
+        header = []
+        header.append(f'# Documento de Revisión de Traducciones - {base_name}\n')
+        header.append('## Instrucciones para la Empresa de Traducciones\n')
+        header.append(f'Este documento contiene todas las claves de traducción en {base_name} (idioma base) y sus equivalentes en otros idiomas.')
+        header.append('Por favor, revise cada traducción y corrija cualquier error o inconsistencia.\n')
         
-        # Flatten translations
-        flat_base = flatten_dict(base_translations)
-        
-        # Create table
-        doc.append(f'| Clave | {language_names.get(base_lang, base_lang)} (Base) | ' + ' | '.join([language_names.get(lang, lang) for lang in sorted(other_languages)]) + ' |')
-        doc.append('|' + '|'.join(['---'] * (len(other_languages) + 2)) + '|')
-        
-        for key in sorted(flat_base.keys()):
-            base_value = flat_base[key]
-            row = [f'`{key}`', f'`{base_value}`']
-            
-            for lang in sorted(other_languages):
-                lang_file = locales_dir / lang / 'translations.json'
-                if lang_file.exists():
-                    with open(lang_file, 'r', encoding='utf-8') as f:
-                        lang_translations = json.load(f)
-                    flat_lang = flatten_dict(lang_translations)
-                    value = flat_lang.get(key, '**[FALTA TRADUCCIÓN]**')
-                    row.append(f'`{value}`')
-                else:
-                    row.append('**[ARCHIVO NO ENCONTRADO]**')
-            
-            doc.append('| ' + ' | '.join(row) + ' |')
+        output_file = output_dir / f'DOCUMENTO_REVISION_TRADUCCIONES_{base_lang.upper()}.md'
+        views.append(ReviewView(base_lang, output_file, header))
+    return views
+
+def render_views_from_file(catalog_path, base_langs, output_dir):
+    """
+    Tarea de un worker: abre el catálogo compilado (mmap, sin copiar datos
+    entre procesos) y escribe los documentos de sus idiomas base.
+    """
+    with CompiledCatalog(catalog_path) as compiled:
+        catalog = compiled.view('translations')
+        return render_review_documents(catalog, review_views(base_langs, output_dir))
+
+def generate_xlsx_task():
+    from generate_translation_xlsx import generate_translation_xlsx
+    generate_translation_xlsx()
+    return []
+
+def generate_translation_reviews_all_languages(jobs=1, with_xlsx=False):
+    locales_dir = LOCALES_DIR
+    
+    # Open the compiled catalog (rebuilt only when locales/ changed)
+    with open_compiled_catalog(locales_dir=locales_dir) as compiled:
+        catalog = compiled.view('translations')
+        languages = catalog.languages
         
-        # Write to file
-        output_file = locales_dir.parent / f'DOCUMENTO_REVISION_TRADUCCIONES_{base_lang.upper()}.md'
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(doc))
+        if jobs <= 1:
+            # Build the key × language matrix once and stream every base-language view from it
+            print(f'Generating review documents for {", ".join(languages)}...')
+            for output_file in render_review_documents(catalog, review_views(languages, locales_dir.parent)):
+                print(f'Documento generado: {output_file}')
+            if with_xlsx:
+                generate_xlsx_task()
+            return
         
-        print(f'Documento generado: {output_file}')
+        # One task per group of base languages; workers only receive the catalog path
+        groups = [languages[i::jobs] for i in range(min(jobs, len(languages)))]
+        print(f'Generating review documents for {", ".join(languages)} with {jobs} processes...')
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(render_views_from_file, compiled.path, group, locales_dir.parent) for group in groups]
+            if with_xlsx:
+                futures.append(pool.submit(generate_xlsx_task))
+            for future in futures:
+                for output_file in future.result():
+                    print(f'Documento generado: {output_file}')
 
 if __name__ == '__main__':
-    generate_translation_reviews_all_languages()
+    parser = argparse.ArgumentParser(description='Genera un documento de revisión por idioma base.')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='Número de procesos (por defecto 1)')
+    parser.add_argument('--xlsx', action='store_true', help='Genera también TRADUCCIONES_CONSOLIDADAS.xlsx en el mismo pool')
+    args = parser.parse_args()
+    generate_translation_reviews_all_languages(jobs=args.jobs, with_xlsx=args.xlsx)
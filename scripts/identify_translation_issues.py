@@ -1,72 +1,36 @@
 
-import pandas as pd
-
-def identify_translation_issues():
-    file_path = "/home/ubuntu/piano-emotion-manager/TRADUCCIONES_CONSOLIDADAS.xlsx"
-    df = pd.read_excel(file_path)
-    
-    issues = []
-
-    # 1. Missing translations
-    missing = df[df.isnull().any(axis=1)]
-    for index, row in missing.iterrows():
-        for lang in df.columns[1:]:
-            if pd.isnull(row[lang]):
-                issues.append({
-                    "Clave": row["Clave"],
-                    "Idioma": lang,
-                    "Problema": "Traducción faltante",
-                    "Valor Original": "",
-                    "Sugerencia": f"Traducir ",
-                })
-
-    # 2. Inconsistent translations
-    def check_consistency(term_es, term_en):
-        inconsistent = df[(df["Español"].str.contains(term_es, na=False)) & (~df["Inglés"].str.contains(term_en, na=False))]
-        for index, row in inconsistent.iterrows():
-            issues.append({
-                "Clave": row["Clave"],
-                "Idioma": "Inglés",
-                "Problema": f"Inconsistencia en la traducción de ",
-                "Valor Original": row["Inglés"],
-                "Sugerencia": f"Usar ",
-            })
-
-    check_consistency("factura", "invoice")
-    check_consistency("cliente", "client")
-    check_consistency("piano", "piano")
-
-    # 3. Placeholder issues
-    placeholders = df[df.apply(lambda row: row.astype(str).str.contains(r"{{\w+}}").any(), axis=1)]
-    for index, row in placeholders.iterrows():
-        for lang in df.columns[1:]:
-            if isinstance(row[lang], str) and "[[" in row[lang]:
-                issues.append({
-                    "Clave": row["Clave"],
-                    "Idioma": lang,
-                    "Problema": "Placeholder sin traducir",
-                    "Valor Original": row[lang],
-                    "Sugerencia": "Traducir el contenido del placeholder",
-                })
-
-    # 4. Length issues (example: translation is much longer/shorter than original)
-    for index, row in df.iterrows():
-        es_len = len(str(row["Español"]))
-        for lang in df.columns[1:]:
-            lang_len = len(str(row[lang]))
-            if es_len > 0 and (lang_len > es_len * 2 or lang_len < es_len / 2):
-                issues.append({
-                    "Clave": row["Clave"],
-                    "Idioma": lang,
-                    "Problema": "Longitud de la traducción sospechosa",
-                    "Valor Original": row[lang],
-                    "Sugerencia": "Revisar si la traducción es demasiado larga o corta",
-                })
-
-    # Save issues to a new Excel file
-    issues_df = pd.DataFrame(issues)
-    issues_df.to_excel("/home/ubuntu/piano-emotion-manager/TRADUCCIONES_ERRORES.xlsx", index=False)
-    print(f"Se encontraron {len(issues)} problemas de traducción. El informe se ha guardado en TRADUCCIONES_ERRORES.xlsx")
+import argparse
+from pipeline_store import export_stage_xlsx, load_stage, save_stage
+from qa_rules import QAEngine, default_rules
+from qa_store import IncrementalQA
+
+def find_translation_issues(df, rules=None):
+    """
+    Ejecuta las reglas de calidad sobre la matriz claves × idiomas en una sola
+    pasada; el orden de salida es el de las reglas y, dentro de cada una,
+    clave por clave.
+    """
+    return QAEngine(default_rules() if rules is None else rules).run(df)
+
+def identify_translation_issues(incremental=True):
+    df = load_stage("consolidadas")
+    if incremental:
+        # Only rows changed since the last run (or checked by a changed rule) are re-evaluated
+        qa = IncrementalQA(QAEngine(default_rules()), "errores")
+        result = qa.run(df)
+        print(qa.summary())
+    else:
+        result = find_translation_issues(df)
+    issues_df = result.issues()
+
+    # Save issues as the "errores" pipeline stage and export the user-facing workbook from it
+    save_stage("errores", issues_df)
+    output_file = export_stage_xlsx("errores")
+    print(result.format_stats())
+    print(f"Se encontraron {len(issues_df)} problemas de traducción. El informe se ha guardado en {output_file.name}")
 
 if __name__ == "__main__":
-    identify_translation_issues()
+    parser = argparse.ArgumentParser(description="Identifica problemas de traducción en la etapa 'consolidadas'.")
+    parser.add_argument("--completo", action="store_true", help="Revisa todas las celdas, sin reutilizar resultados")
+    args = parser.parse_args()
+    identify_translation_issues(incremental=not args.completo)
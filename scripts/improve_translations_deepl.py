@@ -1,7 +1,9 @@
 
-import pandas as pd
-import deepl
 import os
+from pipeline_store import load_stage, save_stage
+from machine_translation import AsyncTranslationClient, DeepLBackend, ProgressReporter
+from mt_journal import TranslationJournal
+from translation_memory import TranslationMemory
 
 def improve_translations_with_deepl():
     # Get API key from environment
@@ -12,12 +14,14 @@ def improve_translations_with_deepl():
         print("Por favor, configura la variable de entorno DEEPL_API_KEY con tu clave de API de DeepL.")
         return
     
-    # Initialize DeepL translator
-    translator = deepl.Translator(api_key)
+    # Initialize DeepL translator (batched, concurrent requests with retries)
+    # Strings already translated in earlier runs come from the translation memory;
+    # an interrupted run resumes from its journal
+    journal = TranslationJournal("improve_translations_deepl")
+    client = AsyncTranslationClient(DeepLBackend(api_key), memory=TranslationMemory(), journal=journal)
     
     # Load original translations
-    file_path = "/home/ubuntu/piano-emotion-manager/TRADUCCIONES_CONSOLIDADAS.xlsx"
-    df = pd.read_excel(file_path)
+    df = load_stage("consolidadas")
     
     # Language mapping for DeepL
     language_map = {
@@ -27,7 +31,7 @@ def improve_translations_with_deepl():
         "Español": "ES",
         "Francés": "FR",
         "Italiano": "IT",
-        "Noruego": "NO",
+        "Noruego": "NB",  # Norwegian Bokmål (DeepL has no "NO")
         "Portugués": "PT-PT",
         "Sueco": "SV"
     }
@@ -38,42 +42,35 @@ def improve_translations_with_deepl():
     improved_count = 0
     error_count = 0
     
-    for index, row in df.iterrows():
-        spanish_text = row["Español"]
+    # Spanish sources by row, translated to every target language concurrently
+    spanish = df["Español"]
+    sources = spanish[spanish.notna() & (spanish != "")].astype(str).to_dict()
+    targets = {lang_name: lang_code for lang_name, lang_code in language_map.items() if lang_name != "Español"}
+    results = client.run({lang_code: sources for lang_code in targets.values()}, progress=ProgressReporter())
+    
+    for lang_name, lang_code in targets.items():
+        translations, errors = results[lang_code]
+        print(f"Progreso: {lang_name}: {len(translations)} traducciones mejoradas")
         
-        if pd.isnull(spanish_text) or spanish_text == "":
-            continue
+        # Update the dataframe in one assignment per language
+        if translations:
+            rows = list(translations)
+            df.loc[rows, lang_name] = [translations[row] for row in rows]
+        improved_count += len(translations)
         
-        # For each target language
-        for lang_name, lang_code in language_map.items():
-            if lang_name == "Español":
-                continue
-            
-            try:
-                # Translate from Spanish to target language
-                result = translator.translate_text(spanish_text, target_language=lang_code)
-                improved_translation = result.text
-                
-                # Update the dataframe
-                df.loc[index, lang_name] = improved_translation
-                improved_count += 1
-                
-                # Print progress every 50 translations
-                if improved_count % 50 == 0:
-                    print(f"Progreso: {improved_count} traducciones mejoradas...")
-                    
-            except Exception as e:
-                print(f"Error al traducir '{row['Clave']}' a {lang_name}: {str(e)}")
-                error_count += 1
+        for row, error in errors.items():
+            print(f"Error al traducir '{df.loc[row, 'Clave']}' a {lang_name}: {error}")
+        error_count += len(errors)
     
     # Save improved translations
-    output_file = "/home/ubuntu/piano-emotion-manager/TRADUCCIONES_MEJORADAS_DEEPL.xlsx"
-    df.to_excel(output_file, index=False)
+    save_stage("mejoradas_deepl", df)
+    journal.finish()
     
     print(f"\nMejora de traducciones completada!")
     print(f"Traducciones mejoradas: {improved_count}")
     print(f"Errores: {error_count}")
-    print(f"Archivo guardado: {output_file}")
+    print(client.summary())
+    print("Resultado guardado en la etapa 'mejoradas_deepl'")
 
 if __name__ == "__main__":
     improve_translations_with_deepl()
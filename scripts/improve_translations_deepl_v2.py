@@ -1,9 +1,15 @@
 
-import pandas as pd
-import deepl
+import argparse
+import numpy as np
 import os
+from pipeline_store import load_stage, save_stage
+from machine_translation import DEEPL_CODES, AsyncTranslationClient, DeepLBackend, ProgressReporter
+from mt_journal import TranslationJournal
+from translation_memory import TranslationMemory
+from mt_state import TranslationState
+from translation_catalog import BASE_LANG, LANGUAGE_NAMES
 
-def improve_translations_with_deepl():
+def improve_translations_with_deepl(full=False):
     # Get API key from environment
     api_key = os.getenv("DEEPL_API_KEY")
     
@@ -11,67 +17,68 @@ def improve_translations_with_deepl():
         print("Error: DEEPL_API_KEY no está configurada en las variables de entorno.")
         return
     
-    # Initialize DeepL translator
-    translator = deepl.Translator(api_key)
+    # Initialize DeepL translator (batched, concurrent requests with retries)
+    # Strings already translated in earlier runs come from the translation memory
+    journal = TranslationJournal("improve_translations_deepl_v2")
+    client = AsyncTranslationClient(DeepLBackend(api_key), memory=TranslationMemory(), journal=journal)
     
     # Load original translations
-    file_path = "/home/ubuntu/piano-emotion-manager/TRADUCCIONES_CONSOLIDADAS.xlsx"
-    df = pd.read_excel(file_path)
-    
-    # Language mapping for DeepL (using correct language codes)
-    language_map = {
-        "Danés": "DA",
-        "Alemán": "DE",
-        "Inglés": "EN-US",
-        "Español": "ES",
-        "Francés": "FR",
-        "Italiano": "IT",
-        "Noruego": "NB",  # Norwegian Bokmål
-        "Portugués": "PT-PT",
-        "Sueco": "SV"
-    }
+    df = load_stage("consolidadas")
     
     print("Iniciando mejora de traducciones con DeepL...")
     
     improved_count = 0
+    reused_count = 0
     error_count = 0
     
-    for index, row in df.iterrows():
-        spanish_text = row["Español"]
+    # Per-cell state: only new or changed Spanish sources and missing targets are
+    # translated; cells edited by hand since the last run are locked
+    state = TranslationState("mejoradas_deepl")
+    keys = df["Clave"].to_numpy(dtype=object)
+    row_of = dict(zip(keys, df.index))
+    # Column name → DeepL code of each target language
+    targets = {LANGUAGE_NAMES[lang]: deepl_code for lang, deepl_code in DEEPL_CODES.items() if lang != BASE_LANG}
+    plans = {lang_name: state.plan(lang_name, keys, df["Español"], df[lang_name], full=full) for lang_name in targets}
+    
+    # Every target language concurrently
+    results = client.run({targets[lang_name]: plan.sources_to_translate() for lang_name, plan in plans.items()},
+                         progress=ProgressReporter())
+    
+    for lang_name, lang_code in targets.items():
+        plan = plans[lang_name]
+        translations, errors = results[lang_code]
+        print(f"Progreso: {plan.summary()}")
         
-        if pd.isnull(spanish_text) or spanish_text == "":
-            continue
+        # Unchanged cells keep their previous machine translation; one assignment per language
+        reused = np.flatnonzero(plan.reuse)
+        updates = dict(zip(plan.keys[reused], plan.previous[reused]))
+        updates.update(translations)
+        if updates:
+            df.loc[[row_of[key] for key in updates], lang_name] = list(updates.values())
+        improved_count += len(translations)
+        reused_count += len(reused)
         
-        # For each target language
-        for lang_name, lang_code in language_map.items():
-            if lang_name == "Español":
-                continue
-            
-            try:
-                # Translate from Spanish to target language using correct syntax
-                result = translator.translate_text(spanish_text, target_lang=lang_code)
-                improved_translation = result.text
-                
-                # Update the dataframe
-                df.loc[index, lang_name] = improved_translation
-                improved_count += 1
-                
-                # Print progress every 100 translations
-                if improved_count % 100 == 0:
-                    print(f"Progreso: {improved_count} traducciones mejoradas...")
-                    
-            except Exception as e:
-                print(f"Error al traducir '{row['Clave']}' a {lang_name}: {str(e)}")
-                error_count += 1
+        for key in plan.keys[plan.review]:
+            print(f"Revisar '{key}' en {lang_name}: el español cambió y la celda está editada a mano")
+        for key, error in errors.items():
+            print(f"Error al traducir '{key}' a {lang_name}: {error}")
+        error_count += len(errors)
     
-    # Save improved translations
-    output_file = "/home/ubuntu/piano-emotion-manager/TRADUCCIONES_MEJORADAS_DEEPL.xlsx"
-    df.to_excel(output_file, index=False)
+    # Save improved translations, then the per-cell state with the values written
+    save_stage("mejoradas_deepl", df)
+    for lang_name, plan in plans.items():
+        state.save(plan, results[targets[lang_name]][0], df[lang_name].to_numpy(dtype=object))
+    journal.finish()
     
     print(f"\nMejora de traducciones completada!")
     print(f"Traducciones mejoradas: {improved_count}")
+    print(f"Sin cambios (traducción anterior): {reused_count}")
     print(f"Errores: {error_count}")
-    print(f"Archivo guardado: {output_file}")
+    print(client.summary())
+    print("Resultado guardado en la etapa 'mejoradas_deepl'")
 
 if __name__ == "__main__":
-    improve_translations_with_deepl()
+    parser = argparse.ArgumentParser(description="Traduce con DeepL las celdas nuevas o cuyo español cambió.")
+    parser.add_argument("--completo", action="store_true", help="Vuelve a traducir todas las celdas no bloqueadas")
+    args = parser.parse_args()
+    improve_translations_with_deepl(args.completo)
@@ -0,0 +1,447 @@
+
+"""
+Traducción automática por lotes, concurrente y con reintentos.
+
+Los textos de origen se agrupan por idioma de destino en lotes acotados
+(número de textos y tamaño en bytes) y cada lote es una sola petición al
+servicio; los resultados se devuelven por clave. Los textos repetidos se
+traducen una sola vez.
+
+Las peticiones de todos los idiomas se lanzan con asyncio y concurrencia
+acotada, pasan por un limitador de ritmo (token bucket) y se reintentan con
+espera exponencial ante 429, errores 5xx y fallos de red. Con una
+memoria de traducción (translation_memory) solo se piden los textos que no
+están en ella, y cada lote traducido se guarda en cuanto llega. Con un
+diario (mt_journal) la ejecución se puede reanudar tras un corte: lo ya
+anotado no se vuelve a pedir. ProgressReporter muestra el avance con ritmo
+y tiempo estimado.
+
+Los servicios se envuelven en backends con la misma interfaz
+(`translate_batch(texts, target_lang)` → lista de traducciones en el mismo
+orden). DeepL se llama por HTTP con la librería estándar (DEEPL_SERVER_URL
+permite apuntar a un servidor simulado); la librería de Google solo se
+importa al crear su backend, y se puede inyectar una fábrica simulada.
+"""
+import asyncio
+import json
+import os
+import random
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from translation_memory import normalize_source, restore_spaces
+
+# Language codes used in locales/ → DeepL codes
+DEEPL_CODES = {
+    "da": "DA",
+    "de": "DE",
+    "en": "EN-US",
+    "es": "ES",
+    "fr": "FR",
+    "it": "IT",
+    "no": "NB",  # Norwegian Bokmål
+    "pt": "PT-PT",
+    "sv": "SV",
+}
+
+
+class TranslationError(Exception):
+    """
+    Fallo de una petición de traducción, con el código HTTP si lo hay.
+    """
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def is_retryable(error):
+    """
+    429, 5xx y errores de red se reintentan; el resto (p. ej. 403 o 456,
+    cuota agotada) no.
+    """
+    if isinstance(error, TranslationError):
+        return error.status is not None and (error.status == 429 or error.status >= 500)
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code == 429 or error.code >= 500
+    # Network failures only: other OSErrors (PermissionError, FileNotFoundError...) are local
+    return isinstance(error, (ConnectionError, TimeoutError, socket.timeout, urllib.error.URLError))
+
+
+def _retry_after(headers):
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+def batches(texts, max_items, max_bytes, separable=None):
+    """
+    Agrupa textos en lotes de como mucho `max_items` textos y `max_bytes`
+    bytes UTF-8. Un texto mayor que el límite va solo en su lote; los que
+    no cumplen `separable` (si se da) también.
+    """
+    batch, size = [], 0
+    for text in texts:
+        text_size = len(text.encode('utf-8'))
+        alone = separable is not None and not separable(text)
+        if batch and (alone or len(batch) >= max_items or size + text_size > max_bytes):
+            yield batch
+            batch, size = [], 0
+        batch.append(text)
+        size += text_size
+        if alone:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+class DeepLBackend:
+    """
+    API HTTP de DeepL (v2/translate): hasta 50 textos por petición y 128 KiB
+    de cuerpo. Las claves de la API gratuita (':fx') usan su propio servidor.
+    """
+
+    max_items = 50
+    max_bytes = 120_000
+    separable = None
+
+    def __init__(self, api_key, server_url=None, source_lang="es", timeout=30):
+        if server_url is None:
+            server_url = os.getenv("DEEPL_SERVER_URL") or (
+                "https://api-free.deepl.com" if api_key.endswith(":fx") else "https://api.deepl.com"
+            )
+        self.api_key = api_key
+        self.server_url = server_url.rstrip("/")
+        self.source_lang = DEEPL_CODES.get(source_lang, source_lang)
+        self.timeout = timeout
+
+    def __repr__(self):
+        return f'DeepLBackend(server_url={self.server_url!r}, source_lang={self.source_lang!r})'
+
+    @property
+    def engine(self):
+        return f'deepl:{self.source_lang}'
+
+    def translate_batch(self, texts, target_lang):
+        body = json.dumps({
+            "text": list(texts),
+            "source_lang": self.source_lang,
+            "target_lang": DEEPL_CODES.get(target_lang, target_lang),
+        }).encode("utf-8")
+        request = urllib.request.Request(f"{self.server_url}/v2/translate", data=body, headers={
+            "Authorization": f"DeepL-Auth-Key {self.api_key}",
+            "Content-Type": "application/json",
+        })
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.load(response)
+        except urllib.error.HTTPError as e:
+            raise TranslationError(f"HTTP {e.code}: {e.reason}", status=e.code, retry_after=_retry_after(e.headers)) from e
+        return [item["text"] for item in payload["translations"]]
+
+
+class GoogleBackend:
+    """
+    Google Translate (deep_translator) traduce un texto por petición, de
+    hasta 5000 caracteres: los textos de una sola línea se envían juntos, uno
+    por línea, y se separan al volver. Si el número de líneas no cuadra, el
+    lote se traduce texto a texto.
+
+    Los traductores de deep_translator guardan estado de cada llamada, así
+    que cada hilo de trabajo usa los suyos.
+
+    Los errores de deep_translator se convierten en TranslationError: 429
+    para TooManyRequests y 502 para RequestError (respuesta no 2xx, cuyo
+    código la librería no conserva), para que se reintenten; los fallos de
+    conexión y los tiempos agotados de requests, en ConnectionError.
+    """
+
+    max_items = 100
+    max_bytes = 4_500
+
+    def __init__(self, source_lang="es", translator_factory=None):
+        # (exception types, HTTP status) pairs mapped to TranslationError, and
+        # the requests network errors, raised again as ConnectionError
+        self._errors = ()
+        self._network_errors = ()
+        if translator_factory is None:
+            from deep_translator import GoogleTranslator
+            from deep_translator.exceptions import RequestError, TooManyRequests
+            from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
+            translator_factory = GoogleTranslator
+            self._errors = (((TooManyRequests,), 429), ((RequestError,), 502))
+            self._network_errors = (RequestsConnectionError, Timeout)
+        self.source_lang = source_lang
+        self.translator_factory = translator_factory
+        # One translator per worker thread and target language: they keep per-call state
+        self._local = threading.local()
+
+    def __repr__(self):
+        return f'GoogleBackend(source_lang={self.source_lang!r})'
+
+    @property
+    def engine(self):
+        return f'google:{self.source_lang}'
+
+    @staticmethod
+    def separable(text):
+        # One non-empty line without surrounding blanks survives the round trip
+        return bool(text) and '\n' not in text and text == text.strip()
+
+    def _translator(self, target_lang):
+        translators = getattr(self._local, 'translators', None)
+        if translators is None:
+            translators = self._local.translators = {}
+        if target_lang not in translators:
+            translators[target_lang] = self.translator_factory(source=self.source_lang, target=target_lang)
+        return translators[target_lang]
+
+    def translate_batch(self, texts, target_lang):
+        translator = self._translator(target_lang)
+        try:
+            if len(texts) > 1:
+                lines = translator.translate('\n'.join(texts)).split('\n')
+                if len(lines) == len(texts):
+                    return [line.strip() for line in lines]
+            return [translator.translate(text) for text in texts]
+        except Exception as e:
+            for types, status in self._errors:
+                if isinstance(e, types):
+                    raise TranslationError(str(e), status=status) from e
+            if isinstance(e, self._network_errors):
+                raise ConnectionError(str(e)) from e
+            raise
+
+
+class TokenBucket:
+    """
+    Limitador de ritmo: `rate` peticiones por segundo de media, con ráfagas
+    de hasta `capacity`.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    async def acquire(self):
+        while True:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # No await between the check and the update: safe within one event loop
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncTranslationClient:
+    """
+    Cliente asíncrono sobre un backend: como mucho `concurrency` peticiones
+    en curso entre todos los idiomas, `requests_per_second` de media (None,
+    sin límite) y hasta `max_retries` reintentos con espera exponencial
+    (`backoff` · 2^intento, con jitter, hasta `max_backoff`; o lo que pida
+    Retry-After).
+
+    Los textos se agrupan por su forma normalizada (sin espacios en los
+    extremos), que es la que se envía; con `memory` (TranslationMemory) solo
+    se piden los que no están en ella. Con `journal` (TranslationJournal) se
+    reanuda una ejecución cortada y se anota cada lote traducido; el diario
+    se vacía en disco también si la ejecución se interrumpe.
+
+    Las llamadas del backend son bloqueantes y se ejecutan en hilos; un
+    backend con `atranslate_batch` (corrutina) se usa directamente.
+    """
+
+    def __init__(self, backend, concurrency=4, requests_per_second=5.0, max_retries=5, backoff=0.5, max_backoff=30.0,
+                 memory=None, journal=None):
+        self.backend = backend
+        self.memory = memory
+        self.journal = journal
+        self.concurrency = concurrency
+        self.requests_per_second = requests_per_second
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.requests = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.resumed = 0
+
+    def _delay(self, attempt, error):
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        return min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    async def _call(self, texts, target_lang):
+        translate = getattr(self.backend, 'atranslate_batch', None)
+        if translate is not None:
+            return await translate(texts, target_lang)
+        return await asyncio.to_thread(self.backend.translate_batch, texts, target_lang)
+
+    async def _request(self, texts, target_lang, semaphore, bucket):
+        attempt = 0
+        while True:
+            async with semaphore:
+                if bucket is not None:
+                    await bucket.acquire()
+                self.requests += 1
+                try:
+                    results = await self._call(texts, target_lang)
+                except Exception as e:
+                    error = e
+                else:
+                    if len(results) != len(texts):
+                        raise TranslationError(f'{len(results)} traducciones para {len(texts)} textos')
+                    return results
+            if attempt >= self.max_retries or not is_retryable(error):
+                raise error
+            self.retries += 1
+            await asyncio.sleep(self._delay(attempt, error))
+            attempt += 1
+
+    async def translate(self, jobs, progress=None):
+        """
+        Traduce {idioma: {clave: texto}}. Devuelve {idioma: ({clave:
+        traducción}, {clave: error})}; un lote que falla tras los reintentos
+        no detiene los demás. `progress(hechos, total)` cuenta textos únicos.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        bucket = TokenBucket(self.requests_per_second) if self.requests_per_second else None
+        results = {}
+        tasks = []
+        counter = {'done': 0, 'total': 0}
+
+        def assign(target_lang, keys_by_text, text, translation):
+            translations = results[target_lang][0]
+            for key, original in keys_by_text[text]:
+                translations[key] = restore_spaces(original, translation)
+
+        async def run_batch(target_lang, texts, keys_by_text):
+            errors = results[target_lang][1]
+            try:
+                translated = await self._request(texts, target_lang, semaphore, bucket)
+            except Exception as e:
+                for text in texts:
+                    for key, _ in keys_by_text[text]:
+                        errors[key] = str(e)
+            else:
+                for text, translation in zip(texts, translated):
+                    assign(target_lang, keys_by_text, text, translation)
+                if self.memory is not None:
+                    self.memory.store(self.backend.engine, target_lang, zip(texts, translated))
+                if self.journal is not None:
+                    translations = results[target_lang][0]
+                    self.journal.append(self.backend.engine, target_lang, [
+                        (key, original, translations[key]) for text in texts for key, original in keys_by_text[text]
+                    ])
+            counter['done'] += len(texts)
+            if progress is not None:
+                progress(counter['done'], counter['total'])
+
+        for target_lang, sources in jobs.items():
+            results[target_lang] = ({}, {})
+            # Keys already in the journal of an interrupted run are not requested again
+            if self.journal is not None:
+                resumed = self.journal.resume(self.backend.engine, target_lang, sources)
+                results[target_lang][0].update(resumed)
+                self.resumed += len(resumed)
+                sources = {key: text for key, text in sources.items() if key not in resumed}
+            # Identical sources (after normalization) are translated once
+            keys_by_text = {}
+            for key, text in sources.items():
+                keys_by_text.setdefault(normalize_source(text), []).append((key, text))
+            pending = list(keys_by_text)
+            if self.memory is not None:
+                cached = self.memory.lookup(self.backend.engine, target_lang, pending)
+                for text, translation in cached.items():
+                    assign(target_lang, keys_by_text, text, translation)
+                self.cache_hits += len(cached)
+                pending = [text for text in pending if text not in cached]
+            counter['total'] += len(pending)
+            for texts in batches(pending, self.backend.max_items, self.backend.max_bytes, self.backend.separable):
+                tasks.append(run_batch(target_lang, texts, keys_by_text))
+
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            # Also on errors and Ctrl-C (cancellation): what arrived is kept for the next run
+            if self.journal is not None:
+                self.journal.flush()
+        return results
+
+    def run(self, jobs, progress=None):
+        """
+        Versión síncrona de translate().
+        """
+        return asyncio.run(self.translate(jobs, progress))
+
+    def summary(self):
+        summary = f'Peticiones: {self.requests} (reintentos: {self.retries}); desde la memoria: {self.cache_hits}'
+        if self.journal is not None:
+            summary += f'; reanudadas del diario: {self.resumed}'
+        return summary
+
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f'{seconds // 3600}h {seconds % 3600 // 60:02d}m'
+    if seconds >= 60:
+        return f'{seconds // 60}m {seconds % 60:02d}s'
+    return f'{seconds}s'
+
+
+class ProgressReporter:
+    """
+    Callback de progreso (`progress(hechos, total)`) que informa, como mucho
+    cada `interval` segundos y al terminar, del avance, el ritmo (textos por
+    segundo) y el tiempo estimado restante.
+    """
+
+    def __init__(self, label='Progreso', interval=5.0, clock=time.monotonic, output=print):
+        self.label = label
+        self.interval = interval
+        self.clock = clock
+        self.output = output
+        self.started = clock()
+        self._reported = None
+
+    def __call__(self, done, total):
+        now = self.clock()
+        if done < total and self._reported is not None and now - self._reported < self.interval:
+            return
+        self._reported = now
+        elapsed = now - self.started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        percent = 100 * done / total if total else 100.0
+        line = f'{self.label}: {done}/{total} textos ({percent:.0f}%), {rate:.1f} textos/s'
+        if done < total:
+            line += f', quedan ~{format_duration((total - done) / rate)}' if rate else ', calculando tiempo restante'
+        else:
+            line += f', en {format_duration(elapsed)}'
+        self.output(line)
+
+
+def translate_languages(backend, jobs, progress=None, **options):
+    """
+    Atajo síncrono de AsyncTranslationClient(backend, **options).run(jobs).
+    """
+    return AsyncTranslationClient(backend, **options).run(jobs, progress)
+
+
+def translate_texts(backend, sources, target_lang, progress=None, **options):
+    """
+    Traduce {clave: texto} a `target_lang`. Devuelve ({clave: traducción},
+    {clave: error}).
+    """
+    return translate_languages(backend, {target_lang: sources}, progress, **options)[target_lang]
@@ -0,0 +1,113 @@
+
+"""
+Diario de una ejecución de traducción automática, para poder reanudarla.
+
+Cada traducción recibida se anota en el diario (SQLite) con su clave, el
+idioma, el motor y el hash del texto de origen; las anotaciones se escriben
+por lotes, cada `flush_every` traducciones o `flush_seconds` segundos, y
+siempre al terminar o interrumpirse la ejecución. Si la ejecución se corta
+(fallo, cuota agotada, Ctrl-C) antes de guardar el resultado, la siguiente
+toma del diario lo ya traducido y solo pide el resto.
+
+Una anotación solo se reutiliza si el texto de origen de la clave no ha
+cambiado. El diario de una ejecución se borra con finish(), una vez
+guardado el resultado.
+"""
+import json
+import sqlite3
+import time
+from translation_catalog import CACHE_DIR
+from translation_memory import source_hash
+
+JOURNAL_PATH = CACHE_DIR / 'mt_journal.sqlite'
+
+
+def _connect(journal_path):
+    journal_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(journal_path, timeout=30)
+    # Keys are JSON-encoded: row labels may be integers or strings
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS mt_journal ('
+        'run TEXT NOT NULL, engine TEXT NOT NULL, target_lang TEXT NOT NULL, key TEXT NOT NULL, '
+        'source_hash TEXT NOT NULL, translation TEXT NOT NULL, created REAL NOT NULL, '
+        'PRIMARY KEY (run, engine, target_lang, key)) WITHOUT ROWID'
+    )
+    return conn
+
+
+class TranslationJournal:
+    """
+    Diario de la ejecución `run` (p. ej. el nombre del script).
+    """
+
+    def __init__(self, run, journal_path=JOURNAL_PATH, flush_every=200, flush_seconds=5.0, clock=time.monotonic):
+        self.run = run
+        self.journal_path = journal_path
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self.clock = clock
+        self._pending = []
+        self._flushed = clock()
+
+    def __repr__(self):
+        return f'TranslationJournal({self.run!r}, {str(self.journal_path)!r})'
+
+    def resume(self, engine, target_lang, sources):
+        """
+        {clave: traducción} de las claves de `sources` ({clave: texto}) que
+        ya están en el diario con el mismo texto de origen.
+        """
+        conn = _connect(self.journal_path)
+        try:
+            rows = conn.execute(
+                'SELECT key, source_hash, translation FROM mt_journal WHERE run = ? AND engine = ? AND target_lang = ?',
+                (self.run, engine, target_lang),
+            ).fetchall()
+        finally:
+            conn.close()
+        found = {}
+        for encoded, digest, translation in rows:
+            key = json.loads(encoded)
+            if key in sources and source_hash(sources[key]) == digest:
+                found[key] = translation
+        return found
+
+    def append(self, engine, target_lang, items):
+        """
+        Anota [(clave, texto, traducción)]; se escriben al llegar al tamaño
+        o al tiempo de lote.
+        """
+        now = time.time()
+        self._pending.extend(
+            (self.run, engine, target_lang, json.dumps(key, ensure_ascii=False), source_hash(text), translation, now)
+            for key, text, translation in items
+        )
+        if len(self._pending) >= self.flush_every or self.clock() - self._flushed >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        """
+        Escribe las anotaciones pendientes en una transacción.
+        """
+        self._flushed = self.clock()
+        if not self._pending:
+            return
+        conn = _connect(self.journal_path)
+        try:
+            with conn:
+                conn.executemany('INSERT OR REPLACE INTO mt_journal VALUES (?, ?, ?, ?, ?, ?, ?)', self._pending)
+        finally:
+            conn.close()
+        self._pending = []
+
+    def finish(self):
+        """
+        Borra el diario de la ejecución (el resultado ya está guardado).
+        """
+        self._pending = []
+        conn = _connect(self.journal_path)
+        try:
+            with conn:
+                conn.execute('DELETE FROM mt_journal WHERE run = ?', (self.run,))
+        finally:
+            conn.close()
@@ -0,0 +1,207 @@
+
+"""
+Estado de la traducción automática por celda, para traducir solo el delta.
+
+Para cada celda (clave, idioma de destino) traducida automáticamente se
+guarda el hash del texto en español del que se tradujo, el hash del valor
+que había en la entrada, el del valor que se escribió y la traducción. En la
+siguiente ejecución:
+
+- si falta el destino, se traduce;
+- si la entrada cambió y no es lo que se escribió (p. ej. la traducción que
+  vuelve de los locales tras la revisión), alguien la ha editado a mano: la
+  celda queda bloqueada y la traducción automática no la toca;
+- si cambió el español y la celda no está bloqueada, se vuelve a traducir
+  (si está bloqueada, se marca para revisión hasta que se vuelva a editar);
+- si no cambió nada, se reutiliza la traducción guardada.
+
+Vaciar el destino de una celda bloqueada la desbloquea (se traduce de
+nuevo). Las celdas sin estado (nunca traducidas por este ámbito) se
+traducen, salvo con `lock_untracked`: entonces los valores que ya existían
+se tratan como trabajo humano y quedan bloqueados.
+
+Cada ámbito e idioma ocupa una fila, con los hashes y el bloqueo como
+matrices, como en qa_store.
+"""
+import json
+import sqlite3
+import numpy as np
+import pandas as pd
+from translation_catalog import CACHE_DIR
+
+STATE_PATH = CACHE_DIR / 'mt_state.sqlite'
+
+
+def _connect(state_path):
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(state_path, timeout=30)
+    # Per scope and target language: key order, digests (int64) of the source,
+    # of the input target and of the written target, locked mask (bit-packed)
+    # and the machine translations
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS mt_state ('
+        'scope TEXT NOT NULL, lang TEXT NOT NULL, keys TEXT NOT NULL, sources BLOB NOT NULL, '
+        'inputs BLOB NOT NULL, targets BLOB NOT NULL, locked BLOB NOT NULL, translations TEXT NOT NULL, '
+        'PRIMARY KEY (scope, lang))'
+    )
+    return conn
+
+
+def _values(values):
+    values = np.asarray(values, dtype=object).copy()
+    values[pd.isna(values) | (values == '')] = None
+    return values
+
+
+def _digests(values):
+    return pd.util.hash_array(values).view(np.int64)
+
+
+def _take(stored, rows, fill):
+    # Stored values reordered to the current keys; new keys get `fill`
+    taken = np.full(len(rows), fill, dtype=stored.dtype)
+    known = rows >= 0
+    taken[known] = stored[rows[known]]
+    return taken
+
+
+class TranslationPlan:
+    """
+    Qué hacer con cada celda de un idioma (máscaras alineadas con `keys`):
+    `translate`, `reuse` (con `previous`, la traducción guardada), `locked`,
+    `edited` (editadas desde la última ejecución) y `review` (bloqueadas
+    cuyo español cambió).
+    """
+
+    def __init__(self, lang, keys, sources, targets, known, translate, reuse, locked, edited, review, previous,
+                 previous_sources):
+        self.lang = lang
+        self.keys = keys
+        self.sources = sources
+        self.targets = targets
+        self.known = known
+        self.translate = translate
+        self.reuse = reuse
+        self.locked = locked
+        self.edited = edited
+        self.review = review
+        self.previous = previous
+        self.previous_sources = previous_sources
+
+    def sources_to_translate(self):
+        """
+        {clave: texto en español} de las celdas que hay que traducir.
+        """
+        rows = np.flatnonzero(self.translate)
+        return dict(zip(self.keys[rows], self.sources[rows]))
+
+    def summary(self):
+        return (f'{self.lang}: {int(self.translate.sum())} por traducir, {int(self.reuse.sum())} sin cambios, '
+                f'{int(self.locked.sum())} bloqueadas ({int(self.review.sum())} con el español cambiado)')
+
+
+class TranslationState:
+    """
+    Estado de un ámbito (p. ej. una etapa o un directorio de locales).
+    """
+
+    def __init__(self, scope, state_path=STATE_PATH):
+        self.scope = scope
+        self.state_path = state_path
+
+    def _load(self, lang):
+        conn = _connect(self.state_path)
+        try:
+            return conn.execute(
+                'SELECT keys, sources, inputs, targets, locked, translations FROM mt_state '
+                'WHERE scope = ? AND lang = ?',
+                (self.scope, lang),
+            ).fetchone()
+        finally:
+            conn.close()
+
+    def plan(self, lang, keys, sources, targets, full=False, lock_untracked=False):
+        """
+        Planifica un idioma. `sources` y `targets` son los valores actuales
+        del español y del destino, alineados con `keys` (únicas). Con `full`
+        se traducen también las celdas sin cambios (las bloqueadas, no); con
+        `lock_untracked`, los destinos que ya existen sin estado se bloquean.
+        """
+        keys = np.asarray(keys, dtype=object)
+        if not pd.Index(keys).is_unique:
+            raise ValueError('El estado de traducción necesita claves únicas')
+        sources, targets = _values(sources), _values(targets)
+        n_keys = len(keys)
+
+        stored = self._load(lang)
+        if stored is None:
+            rows = np.full(n_keys, -1)
+            stored_sources = stored_inputs = stored_targets = np.zeros(0, dtype=np.int64)
+            stored_locked = np.zeros(0, dtype=bool)
+            stored_translations = np.zeros(0, dtype=object)
+        else:
+            stored_keys = json.loads(stored[0])
+            rows = pd.Index(stored_keys, dtype=object).get_indexer(keys)
+            stored_sources = np.frombuffer(stored[1], dtype=np.int64)
+            stored_inputs = np.frombuffer(stored[2], dtype=np.int64)
+            stored_targets = np.frombuffer(stored[3], dtype=np.int64)
+            stored_locked = np.unpackbits(np.frombuffer(stored[4], dtype=np.uint8), count=len(stored_keys)).astype(bool)
+            stored_translations = np.array(json.loads(stored[5]), dtype=object)
+
+        known = rows >= 0
+        previous_sources = _take(stored_sources, rows, 0)
+        previous = _take(stored_translations, rows, None)
+        has_source, has_target = pd.notna(sources), pd.notna(targets)
+
+        # Edited by hand: the input changed since the last run and is neither what
+        # was written nor the machine translation (e.g. it came back through review)
+        digests = _digests(targets)
+        edited = (known & has_target & (digests != _take(stored_inputs, rows, 0))
+                  & (digests != _take(stored_targets, rows, 0)) & (targets != previous))
+        locked = (_take(stored_locked, rows, False) | edited) & has_target
+        if lock_untracked:
+            locked |= ~known & has_target
+        source_changed = known & (_digests(sources) != previous_sources)
+        review = locked & source_changed
+
+        if full:
+            translate = has_source & ~locked
+        else:
+            translate = has_source & ~locked & (~known | source_changed | ~has_target)
+        reuse = known & has_source & ~translate & ~locked
+        return TranslationPlan(lang, keys, sources, targets, known, translate, reuse, locked, edited, review,
+                               previous, previous_sources)
+
+    def save(self, plan, translations, targets=None):
+        """
+        Guarda el estado tras la ejecución: `translations` son las
+        traducciones nuevas ({clave: texto}) y `targets`, los valores que se
+        escribieron en el destino, alineados con las claves del plan (por
+        defecto, los de la entrada, para destinos que no se reescriben).
+        """
+        keys = plan.keys
+        targets = plan.targets if targets is None else _values(targets)
+        new = np.array([translations.get(key) for key in keys], dtype=object)
+        translated = pd.notna(new)
+
+        # Translated, newly tracked or edited by hand (reviewed): current source;
+        # the rest keep the source they were translated from
+        current = translated | ~plan.known | plan.edited
+        sources = np.where(current, _digests(plan.sources), plan.previous_sources)
+        keep = translated | plan.known | plan.locked
+        machine = np.where(translated, new, plan.previous)
+
+        conn = _connect(self.state_path)
+        try:
+            with conn:
+                conn.execute('INSERT OR REPLACE INTO mt_state VALUES (?, ?, ?, ?, ?, ?, ?, ?)', (
+                    self.scope, plan.lang,
+                    json.dumps(list(keys[keep]), ensure_ascii=False),
+                    sources[keep].astype(np.int64).tobytes(),
+                    _digests(plan.targets)[keep].tobytes(),
+                    _digests(targets)[keep].tobytes(),
+                    np.packbits(plan.locked[keep] & ~translated[keep]).tobytes(),
+                    json.dumps(list(machine[keep]), ensure_ascii=False),
+                ))
+        finally:
+            conn.close()
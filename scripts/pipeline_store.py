@@ -0,0 +1,263 @@
+
+"""
+Almacén local de las etapas intermedias del pipeline de traducciones.
+
+Las etapas (consolidadas → errores → corregidas → mejoradas_deepl →
+corregidas_para_revisor) se guardan como tablas SQLite con sus tipos, en
+lugar de serializar y volver a leer un xlsx entre cada script. Solo las
+etapas que se entregan a la empresa de traducciones se exportan a xlsx.
+
+Una etapa que aún no está en el almacén se importa de su xlsx heredado; si
+ese xlsx cambia después (tamaño o fecha, y luego su hash), se vuelve a
+importar. Las etapas guardadas por el pipeline no se reimportan.
+"""
+import hashlib
+import json
+import sqlite3
+import sys
+from datetime import datetime
+from translation_catalog import CACHE_DIR, ROOT_DIR
+from xlsx_io import read_translation_sheet, write_translation_sheet
+
+STORE_PATH = CACHE_DIR / 'pipeline.sqlite'
+
+# Stage name → legacy/vendor workbook (None: only in the store)
+STAGES = {
+    'consolidadas': 'TRADUCCIONES_CONSOLIDADAS.xlsx',
+    'errores': 'TRADUCCIONES_ERRORES.xlsx',
+    'corregidas': 'TRADUCCIONES_CORREGIDAS.xlsx',
+    'mejoradas_deepl': 'TRADUCCIONES_MEJORADAS_DEEPL.xlsx',
+    'corregidas_para_revisor': 'TRADUCCIONES_CORREGIDAS_PARA_REVISOR.xlsx',
+    # locales/<lang>.json as they were when corregidas_para_revisor was exported
+    'locales_exportados': None,
+}
+
+# Stages handed to the translation company; only these are written as xlsx
+VENDOR_STAGES = {'consolidadas', 'corregidas_para_revisor'}
+
+# Low-cardinality columns restored as pandas categoricals; the rest load as plain columns
+CATEGORICAL_COLUMNS = {'Idioma', 'Problema'}
+
+
+def stage_xlsx_path(stage):
+    workbook = STAGES[stage]
+    return None if workbook is None else ROOT_DIR / workbook
+
+
+def _connect(store_path):
+    store_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(store_path, timeout=30)
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS stages ('
+        'name TEXT PRIMARY KEY, columns TEXT NOT NULL, dtypes TEXT NOT NULL, '
+        'row_count INTEGER NOT NULL, updated_at TEXT NOT NULL)'
+    )
+    # Stages imported from a legacy xlsx, with the workbook they came from
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS imports ('
+        'name TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, sha256 TEXT NOT NULL)'
+    )
+    return conn
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _table(stage):
+    if stage not in STAGES:
+        raise KeyError(f'Etapa desconocida: {stage}')
+    return _quote(f'stage_{stage}')
+
+
+def _check_headers(stage, headers):
+    duplicated = sorted({header for header in headers if headers.count(header) > 1})
+    if duplicated:
+        raise ValueError(f'La etapa {stage} tiene columnas repetidas: {", ".join(map(repr, duplicated))}')
+
+
+def save_stage_rows(stage, headers, rows, dtypes=None, store_path=STORE_PATH):
+    """
+    Guarda una etapa a partir de filas (cualquier iterable), en streaming.
+    `dtypes` indica las columnas categóricas ({columna: 'category'}).
+    Devuelve el número de filas guardadas.
+    """
+    headers = list(headers)
+    _check_headers(stage, headers)
+    if dtypes is None:
+        dtypes = {header: 'category' for header in headers if header in CATEGORICAL_COLUMNS}
+    table = _table(stage)
+    conn = _connect(store_path)
+    try:
+        with conn:
+            conn.execute('DELETE FROM imports WHERE name = ?', (stage,))
+            conn.execute(f'DROP TABLE IF EXISTS {table}')
+            conn.execute(f'CREATE TABLE {table} ({", ".join(_quote(header) for header in headers)})')
+            placeholders = ', '.join('?' * len(headers))
+            cursor = conn.executemany(f'INSERT INTO {table} VALUES ({placeholders})', rows)
+            row_count = cursor.rowcount
+            conn.execute(
+                'INSERT OR REPLACE INTO stages VALUES (?, ?, ?, ?, ?)',
+                (stage, json.dumps(list(headers)), json.dumps(dtypes), row_count, datetime.now().isoformat(timespec='seconds')),
+            )
+    finally:
+        conn.close()
+    return row_count
+
+
+def save_stage(stage, df, store_path=STORE_PATH):
+    """
+    Guarda un DataFrame como etapa; las etapas para la empresa de
+    traducciones se exportan además a su xlsx.
+    """
+    headers = [str(column) for column in df.columns]
+    _check_headers(stage, headers)
+    dtypes = {
+        header: 'category'
+        for header, dtype in zip(headers, df.dtypes)
+        if header in CATEGORICAL_COLUMNS or str(dtype) == 'category'
+    }
+    records = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+    count = save_stage_rows(stage, headers, records, dtypes, store_path)
+    if stage in VENDOR_STAGES:
+        export_stage_xlsx(stage, store_path=store_path)
+    return count
+
+
+def has_stage(stage, store_path=STORE_PATH):
+    if not store_path.exists():
+        return False
+    conn = _connect(store_path)
+    try:
+        return conn.execute('SELECT 1 FROM stages WHERE name = ?', (stage,)).fetchone() is not None
+    finally:
+        conn.close()
+
+
+def stage_digest(stage, store_path=STORE_PATH):
+    """
+    Hash SHA-256 del contenido de una etapa (cabeceras y filas), o None si
+    la etapa no está guardada.
+    """
+    if not has_stage(stage, store_path):
+        return None
+    # An import whose workbook changed is refreshed first, so the hash follows the xlsx
+    if _import_outdated(stage, store_path):
+        import_stage_xlsx(stage, store_path)
+    headers, rows = iter_stage_rows(stage, store_path)
+    digest = hashlib.sha256(json.dumps(headers).encode('utf-8'))
+    for row in rows:
+        digest.update(json.dumps(row, ensure_ascii=False, default=str).encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def iter_stage_rows(stage, store_path=STORE_PATH):
+    """
+    Devuelve (cabeceras, generador de filas) de una etapa guardada.
+    """
+    conn = _connect(store_path)
+    meta = conn.execute('SELECT columns FROM stages WHERE name = ?', (stage,)).fetchone()
+    if meta is None:
+        conn.close()
+        raise KeyError(f'La etapa {stage} no está en {store_path}')
+
+    def rows():
+        try:
+            yield from conn.execute(f'SELECT * FROM {_table(stage)} ORDER BY rowid')
+        finally:
+            conn.close()
+
+    return json.loads(meta[0]), rows()
+
+
+def _import_outdated(stage, store_path):
+    # Only imported stages are refreshed; a missing workbook keeps the import
+    xlsx_path = stage_xlsx_path(stage)
+    conn = _connect(store_path)
+    try:
+        recorded = conn.execute('SELECT size, mtime_ns, sha256 FROM imports WHERE name = ?', (stage,)).fetchone()
+        if recorded is None or not xlsx_path.exists():
+            return False
+        stat = xlsx_path.stat()
+        if (stat.st_size, stat.st_mtime_ns) == tuple(recorded[:2]):
+            return False
+        if hashlib.sha256(xlsx_path.read_bytes()).hexdigest() != recorded[2]:
+            return True
+        # Touched but identical: remember the new date to skip hashing next time
+        with conn:
+            conn.execute('UPDATE imports SET size = ?, mtime_ns = ? WHERE name = ?', (stat.st_size, stat.st_mtime_ns, stage))
+        return False
+    finally:
+        conn.close()
+
+
+def import_stage_xlsx(stage, store_path=STORE_PATH):
+    """
+    Importa una etapa desde su xlsx heredado y anota de qué archivo viene.
+    """
+    xlsx_path = stage_xlsx_path(stage)
+    if xlsx_path is None:
+        raise KeyError(f'La etapa {stage} no está en {store_path} y no tiene xlsx del que importarse')
+    stat = xlsx_path.stat()
+    digest = hashlib.sha256(xlsx_path.read_bytes()).hexdigest()
+    df = read_translation_sheet(xlsx_path)
+    headers = [str(column) for column in df.columns]
+    records = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+    count = save_stage_rows(stage, headers, records, store_path=store_path)
+    conn = _connect(store_path)
+    try:
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO imports VALUES (?, ?, ?, ?)', (stage, stat.st_size, stat.st_mtime_ns, digest))
+    finally:
+        conn.close()
+    return count
+
+
+def load_stage(stage, store_path=STORE_PATH):
+    """
+    Carga una etapa como DataFrame; las columnas categóricas se restauran
+    como tales.
+
+    Si la etapa todavía no está en el almacén, o se importó de su xlsx
+    heredado y ese archivo ha cambiado, se importa desde el xlsx.
+    """
+    import pandas as pd
+
+    if not has_stage(stage, store_path) or _import_outdated(stage, store_path):
+        import_stage_xlsx(stage, store_path)
+
+    conn = _connect(store_path)
+    try:
+        columns_json, dtypes_json = conn.execute('SELECT columns, dtypes FROM stages WHERE name = ?', (stage,)).fetchone()
+        records = conn.execute(f'SELECT * FROM {_table(stage)} ORDER BY rowid').fetchall()
+    finally:
+        conn.close()
+
+    headers = json.loads(columns_json)
+    df = pd.DataFrame.from_records(records, columns=headers)
+    for header, dtype in json.loads(dtypes_json).items():
+        if dtype == 'category':
+            df[header] = df[header].astype('category')
+    return df
+
+
+def export_stage_xlsx(stage, output_file=None, store_path=STORE_PATH):
+    """
+    Exporta una etapa a xlsx en streaming (por defecto a su archivo habitual).
+    """
+    output_file = stage_xlsx_path(stage) if output_file is None else output_file
+    if output_file is None:
+        raise ValueError(f'La etapa {stage} no tiene xlsx: indique el archivo de salida')
+    headers, rows = iter_stage_rows(stage, store_path)
+    write_translation_sheet(output_file, headers, rows)
+    return output_file
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3 or sys.argv[1] != 'export':
+        print(f'Uso: python {sys.argv[0]} export <etapa> [archivo.xlsx]')
+        print(f'Etapas: {", ".join(STAGES)}')
+        sys.exit(1)
+    output = export_stage_xlsx(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+    print(f'Etapa {sys.argv[2]} exportada a {output}')
@@ -0,0 +1,433 @@
+
+"""
+Motor de reglas de calidad para el catálogo de traducciones.
+
+Cada regla declara qué inspecciona:
+
+    'key'     la clave de cada fila
+    'target'  cada celda de traducción (con acceso a la celda origen en español)
+
+El motor recorre el catálogo una sola vez, columna a columna: los datos
+derivados de cada columna (máscara de presencia, texto, longitudes) se
+calculan una vez y los comparten todas las reglas. Los patrones se compilan
+al crear la regla. Para cada regla se registran el tiempo y los aciertos.
+
+Uso (comprobación rápida de placeholders sobre locales/, p. ej. al guardar):
+    python scripts/qa_rules.py placeholders
+"""
+import hashlib
+import inspect
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from term_matcher import TermMatcher
+from term_normalizer import folder
+
+ISSUE_COLUMNS = ["Clave", "Idioma", "Problema", "Valor Original", "Sugerencia"]
+SOURCE_LANGUAGE = "Español"
+
+# Spanish term → expected English term (used to be repeated in every QA script)
+CONSISTENCY_TERMS = [
+    ("factura", "invoice"),
+    ("cliente", "client"),
+    ("piano", "piano"),
+]
+
+
+# Any edit to the rule code invalidates every stored rule result (see qa_store.py)
+MODULE_DIGEST = hashlib.sha256(b''.join(
+    Path(__file__).with_name(name).read_bytes() for name in ('qa_rules.py', 'term_matcher.py', 'term_normalizer.py')
+)).hexdigest()
+
+# i18next-style interpolations: {name} and {{name}}
+INTERPOLATION_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}|\{\s*(\w+)\s*\}")
+NO_TOKENS = ()
+
+# value → token multiset; equal strings repeat across keys and languages
+_token_cache = {}
+
+
+def interpolation_tokens(value):
+    """
+    Multiconjunto de interpolaciones de un valor, como tupla ordenada
+    (p. ej. ('{slug}', '{{count}}')). Se calcula una vez por cadena.
+    """
+    tokens = _token_cache.get(value)
+    if tokens is None:
+        if '{' not in value:
+            tokens = NO_TOKENS
+        else:
+            tokens = tuple(sorted(
+                f'{{{{{double}}}}}' if double else f'{{{single}}}'
+                for double, single in INTERPOLATION_PATTERN.findall(value)
+            )) or NO_TOKENS
+        _token_cache[value] = tokens
+    return tokens
+
+
+class Column:
+    """
+    Una columna de idioma con sus datos derivados, calculados bajo demanda
+    y una sola vez.
+    """
+
+    def __init__(self, name, values):
+        self.name = name
+        self.values = values
+        self._series = pd.Series(values, dtype=object)
+        self._cache = {}
+
+    def _cached(self, name, compute):
+        if name not in self._cache:
+            self._cache[name] = compute()
+        return self._cache[name]
+
+    @property
+    def present(self):
+        return self._cached('present', lambda: self._series.notna().to_numpy())
+
+    @property
+    def is_text(self):
+        return self._cached('is_text', lambda: self._series.map(type).eq(str).to_numpy())
+
+    @property
+    def text(self):
+        """
+        Valores como texto; las celdas vacías son ''.
+        """
+        return self._cached('text', lambda: self._series.where(self.present, '').astype(str).astype(object))
+
+    @property
+    def lengths(self):
+        return self._cached('lengths', lambda: self.text.str.len().to_numpy(dtype=np.int64))
+
+    @property
+    def tokens(self):
+        """
+        Interpolaciones de cada celda; None en las celdas vacías.
+        """
+        return self._cached('tokens', lambda: [
+            interpolation_tokens(value) if isinstance(value, str) else None
+            for value in self.values
+        ])
+
+    def term_rows(self, matcher):
+        """
+        {término: índices de fila} de un TermMatcher, en una sola pasada
+        compartida por todas las reglas que usan ese autómata.
+        """
+        return self._cached(('terms', id(matcher)), lambda: {
+            term: np.array(rows, dtype=np.intp) for term, rows in matcher.scan(self.values).items()
+        })
+
+    def contains(self, pattern):
+        """
+        Máscara de celdas (de texto) que contienen un patrón compilado.
+        """
+        key = ('contains', pattern.pattern, pattern.flags)
+        return self._cached(key, lambda: self.text.str.contains(pattern, na=False).to_numpy() & self.present)
+
+
+class CatalogMatrix:
+    """
+    Vista claves × idiomas de un DataFrame con columnas 'Clave' y una por idioma.
+    """
+
+    def __init__(self, df, key_column="Clave"):
+        self.keys = df[key_column].to_numpy(dtype=object)
+        self.languages = [column for column in df.columns if column != key_column]
+        self.columns = {lang: Column(lang, df[lang].to_numpy(dtype=object)) for lang in self.languages}
+        self.key_column = Column(key_column, self.keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def source(self):
+        return self.columns[SOURCE_LANGUAGE]
+
+
+class Rule:
+    """
+    Regla base. Las reglas 'target' implementan check(matrix, column) y
+    devuelven una máscara por clave; las reglas 'key' implementan
+    check(matrix, None).
+
+    El resultado de una fila solo puede depender de esa fila (clave, origen
+    y celda), para que qa_store pueda revalidar solo las filas cambiadas.
+    """
+
+    name = ''
+    scope = 'target'
+    problem = ''
+    suggestion = ''
+    # Restrict a target rule to these language columns (None = all)
+    languages = None
+
+    def prepare(self, matrix):
+        pass
+
+    def check(self, matrix, column):
+        raise NotImplementedError
+
+    def fingerprint(self):
+        """
+        Versión de la regla: el código (este módulo y la clase) y sus
+        parámetros. Si cambia, sus resultados guardados dejan de valer.
+        """
+        try:
+            source = inspect.getsource(type(self))
+        except (OSError, TypeError):
+            source = type(self).__qualname__
+        params = sorted((name, repr(value)) for name, value in vars(self).items())
+        return hashlib.sha256(f'{MODULE_DIGEST}\0{source}\0{params}'.encode('utf-8')).hexdigest()
+
+    def issue_values(self, matrix, column, rows):
+        return column.values[rows]
+
+    def issue_suggestions(self, matrix, column, rows):
+        return np.full(len(rows), self.suggestion, dtype=object)
+
+
+class MissingTranslationRule(Rule):
+    name = 'faltantes'
+    problem = "Traducción faltante"
+    suggestion = "Traducir "
+
+    def check(self, matrix, column):
+        return ~column.present
+
+    def issue_values(self, matrix, column, rows):
+        return np.full(len(rows), "", dtype=object)
+
+
+class ConsistencyRule(Rule):
+    problem = "Inconsistencia en la traducción de "
+    suggestion = "Usar "
+
+    def __init__(self, term_es, term_en, target="Inglés"):
+        self.name = f'consistencia:{term_es}'
+        self.languages = [target]
+        self.source_pattern = re.compile(term_es)
+        self.target_pattern = re.compile(term_en)
+
+    def check(self, matrix, column):
+        return matrix.source.contains(self.source_pattern) & ~column.contains(self.target_pattern)
+
+
+class PlaceholderParityRule(Rule):
+    """
+    La traducción debe tener exactamente las mismas interpolaciones que el
+    original en español (mismo nombre y mismo número de apariciones).
+    """
+
+    name = 'placeholders'
+    problem = "Placeholders distintos del original"
+    suggestion = "Conservar los placeholders del original"
+
+    def check(self, matrix, column):
+        source = matrix.source.tokens
+        return np.fromiter(
+            (target is not None and expected is not None and target != expected
+             for expected, target in zip(source, column.tokens)),
+            dtype=bool, count=len(source),
+        )
+
+    def issue_suggestions(self, matrix, column, rows):
+        source = matrix.source.tokens
+        suggestions = []
+        for row in rows:
+            expected, found = Counter(source[row]), Counter(column.tokens[row])
+            parts = []
+            if expected - found:
+                parts.append("faltan " + " ".join(sorted((expected - found).elements())))
+            if found - expected:
+                parts.append("sobran " + " ".join(sorted((found - expected).elements())))
+            suggestions.append(f"{self.suggestion}: {'; '.join(parts)}")
+        return np.array(suggestions, dtype=object)
+
+
+class LengthRule(Rule):
+    name = 'longitud'
+    problem = "Longitud de la traducción sospechosa"
+    suggestion = "Revisar si la traducción es demasiado larga o corta"
+
+    def check(self, matrix, column):
+        # Missing cells are reported by MissingTranslationRule
+        source = matrix.source
+        source_len = source.lengths
+        lengths = column.lengths
+        return column.present & source.present & (source_len > 0) & ((lengths > source_len * 2) | (lengths < source_len / 2))
+
+
+class KeyContainsRule(Rule):
+    """
+    Filas cuya clave contiene un término (sin distinguir mayúsculas ni
+    acentos). No genera problemas; la usan los informes terminológicos. Las
+    reglas creadas con key_term_rules comparten un único autómata.
+    """
+
+    scope = 'key'
+
+    def __init__(self, term, name=None, matcher=None):
+        self.term = term
+        self.name = name or f'clave:{term}'
+        self.matcher = matcher if matcher is not None else TermMatcher([term], normalize=folder)
+
+    def check(self, matrix, column):
+        mask = np.zeros(len(matrix), dtype=bool)
+        mask[matrix.key_column.term_rows(self.matcher).get(self.term, [])] = True
+        return mask
+
+
+def key_term_rules(terms, prefix='clave', whole_words=False):
+    """
+    Una KeyContainsRule por término ('<prefix>:<término>'), todas sobre el
+    mismo autómata: las claves se recorren una sola vez para todos.
+    """
+    terms = list(terms)
+    matcher = TermMatcher(terms, whole_words=whole_words, normalize=folder)
+    return [KeyContainsRule(term, f'{prefix}:{term}', matcher) for term in terms]
+
+
+def default_rules():
+    """
+    Reglas de identify_translation_issues, en el orden del informe.
+    """
+    rules = [MissingTranslationRule()]
+    rules.extend(ConsistencyRule(term_es, term_en) for term_es, term_en in CONSISTENCY_TERMS)
+    rules.extend([PlaceholderParityRule(), LengthRule()])
+    return rules
+
+
+class RuleStats:
+    __slots__ = ('name', 'scope', 'hits', 'seconds')
+
+    def __init__(self, name, scope):
+        self.name = name
+        self.scope = scope
+        self.hits = 0
+        self.seconds = 0.0
+
+
+class QAResult:
+    def __init__(self, matrix, rules, masks, stats):
+        self.matrix = matrix
+        self.rules = rules
+        self.masks = masks
+        self.stats = stats
+
+    def rows(self, rule_name):
+        """
+        Máscara por clave de una regla (para reglas 'target', cualquier idioma).
+        """
+        mask = self.masks[rule_name]
+        return mask if mask.ndim == 1 else mask.any(axis=1)
+
+    def issues(self, rule_names=None):
+        """
+        Problemas de las reglas 'target' como DataFrame, en el orden de
+        registro de las reglas y, dentro de cada una, clave por clave.
+        """
+        matrix = self.matrix
+        lang_names = np.array(matrix.languages, dtype=object)
+        parts = [pd.DataFrame(columns=ISSUE_COLUMNS)]
+        for rule in self.rules:
+            if rule.scope != 'target' or (rule_names is not None and rule.name not in rule_names):
+                continue
+            rows, cols = np.nonzero(self.masks[rule.name])
+            values = np.empty(len(rows), dtype=object)
+            suggestions = np.empty(len(rows), dtype=object)
+            for col in np.unique(cols):
+                selected = cols == col
+                column = matrix.columns[matrix.languages[col]]
+                values[selected] = rule.issue_values(matrix, column, rows[selected])
+                suggestions[selected] = rule.issue_suggestions(matrix, column, rows[selected])
+            parts.append(pd.DataFrame({
+                "Clave": matrix.keys[rows],
+                "Idioma": lang_names[cols],
+                "Problema": rule.problem,
+                "Valor Original": values,
+                "Sugerencia": suggestions,
+            }, columns=ISSUE_COLUMNS))
+        return pd.concat([part for part in parts if len(part)] or parts[:1], ignore_index=True)
+
+    def format_stats(self):
+        lines = [f"{'Regla':32} {'Ámbito':8} {'Aciertos':>9} {'Tiempo':>10}"]
+        for stat in self.stats.values():
+            lines.append(f"{stat.name:32} {stat.scope:8} {stat.hits:>9} {stat.seconds * 1000:>8.1f}ms")
+        return "\n".join(lines)
+
+
+class QAEngine:
+    def __init__(self, rules):
+        names = [rule.name for rule in rules]
+        duplicates = {name for name in names if names.count(name) > 1}
+        if duplicates:
+            raise ValueError(f"Reglas duplicadas: {', '.join(sorted(duplicates))}")
+        self.rules = list(rules)
+
+    def run(self, df):
+        matrix = df if isinstance(df, CatalogMatrix) else CatalogMatrix(df)
+        n_keys, n_langs = len(matrix), len(matrix.languages)
+        stats = {rule.name: RuleStats(rule.name, rule.scope) for rule in self.rules}
+        masks = {}
+
+        def timed(rule, fn, *args):
+            started = time.perf_counter()
+            result = fn(*args)
+            stats[rule.name].seconds += time.perf_counter() - started
+            return result
+
+        for rule in self.rules:
+            timed(rule, rule.prepare, matrix)
+            if rule.scope == 'key':
+                masks[rule.name] = timed(rule, rule.check, matrix, None)
+            else:
+                masks[rule.name] = np.zeros((n_keys, n_langs), dtype=bool)
+
+        # Single traversal: every target rule sees each column while its derived data is cached
+        target_rules = [rule for rule in self.rules if rule.scope == 'target']
+        for col, lang in enumerate(matrix.languages):
+            column = matrix.columns[lang]
+            for rule in target_rules:
+                if rule.languages is not None and lang not in rule.languages:
+                    continue
+                masks[rule.name][:, col] = timed(rule, rule.check, matrix, column)
+
+        for rule in self.rules:
+            stats[rule.name].hits = int(masks[rule.name].sum())
+        return QAResult(matrix, self.rules, masks, stats)
+
+
+def check_placeholder_parity(namespaces=None):
+    """
+    Comprueba la paridad de placeholders de todos los namespaces del
+    catálogo compilado (recompilándolo si los JSON cambiaron).
+    Devuelve el DataFrame de problemas.
+    """
+    from compiled_catalog import NAMESPACES, open_compiled_catalog
+
+    engine = QAEngine([PlaceholderParityRule()])
+    parts = []
+    with open_compiled_catalog() as compiled:
+        for namespace in namespaces or NAMESPACES:
+            issues = engine.run(compiled.view(namespace).to_catalog().to_frame()).issues()
+            issues.insert(0, "Namespace", namespace)
+            parts.append(issues)
+    return pd.concat(parts, ignore_index=True)
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['placeholders']:
+        print(f'Uso: python {sys.argv[0]} placeholders')
+        sys.exit(1)
+    issues = check_placeholder_parity()
+    for issue in issues.itertuples(index=False):
+        print(f'{issue.Namespace}:{issue.Clave} [{issue.Idioma}] {issue.Sugerencia}')
+    print(f'{len(issues)} problemas de placeholders')
+    sys.exit(1 if len(issues) else 0)
@@ -0,0 +1,168 @@
+
+"""
+Resultados de QA por celda, para revalidar solo lo que cambió.
+
+Para cada celda (clave, idioma) se guarda un hash de su valor y del valor
+origen en español; para cada regla, su huella (código y parámetros) y las
+celdas en las que saltó. Cada ámbito ocupa una fila: la matriz de hashes y
+las máscaras se cargan y se guardan de una vez, sin una fila SQL por celda.
+
+En la siguiente ejecución solo se reevalúan las filas con alguna celda
+nueva o cambiada; las reglas nuevas o modificadas (p. ej. por un cambio de
+glosario) se reevalúan sobre todo el catálogo. El resto de resultados se
+reutiliza tal cual.
+"""
+import json
+import sqlite3
+import numpy as np
+import pandas as pd
+from qa_rules import SOURCE_LANGUAGE, CatalogMatrix, QAEngine, QAResult, RuleStats
+from translation_catalog import CACHE_DIR
+
+STORE_PATH = CACHE_DIR / 'qa_cells.sqlite'
+
+# Golden-ratio multiplier: mixes the source hash into the cell hash
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _connect(store_path):
+    store_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(store_path, timeout=30)
+    # Per scope: the key and language order of the last run, its cell digests
+    # (int64 matrix) and, per rule, the cells it hit (bit-packed, same order)
+    conn.executescript(
+        'CREATE TABLE IF NOT EXISTS qa_cells ('
+        'scope TEXT PRIMARY KEY, keys TEXT NOT NULL, langs TEXT NOT NULL, digests BLOB NOT NULL);'
+        'CREATE TABLE IF NOT EXISTS qa_rules ('
+        'scope TEXT NOT NULL, name TEXT NOT NULL, fingerprint TEXT NOT NULL, hits BLOB NOT NULL, '
+        'PRIMARY KEY (scope, name));'
+    )
+    return conn
+
+
+def _align(stored, rows, cols, fill):
+    """
+    Reordena una matriz guardada a las filas/columnas actuales; las que no
+    existían se rellenan con `fill`.
+    """
+    shape = (len(rows),) if stored.ndim == 1 else (len(rows), len(cols))
+    aligned = np.full(shape, fill, dtype=stored.dtype)
+    known_rows = rows >= 0
+    if stored.ndim == 1:
+        aligned[known_rows] = stored[rows[known_rows]]
+    else:
+        known_cols = cols >= 0
+        aligned[np.ix_(known_rows, known_cols)] = stored[np.ix_(rows[known_rows], cols[known_cols])]
+    return aligned
+
+
+def cell_digests(matrix):
+    """
+    Hash de 64 bits (como int64) de cada celda combinado con el de su origen
+    en español: cambia si cambia la celda o el texto a traducir.
+    """
+    source = pd.util.hash_array(matrix.source.values) if SOURCE_LANGUAGE in matrix.columns else np.zeros(len(matrix), np.uint64)
+    digests = np.empty((len(matrix), len(matrix.languages)), dtype=np.uint64)
+    for col, lang in enumerate(matrix.languages):
+        digests[:, col] = (pd.util.hash_array(matrix.columns[lang].values) * _MIX) ^ source
+    return digests.view(np.int64)
+
+
+class IncrementalQA:
+    """
+    Ejecuta un QAEngine reutilizando los resultados guardados de las celdas
+    que no cambiaron. `scope` separa catálogos y conjuntos de reglas
+    distintos dentro del mismo almacén.
+    """
+
+    def __init__(self, engine, scope, store_path=STORE_PATH):
+        self.engine = engine
+        self.scope = scope
+        self.store_path = store_path
+        self.evaluated_rows = 0
+        self.changed_rules = []
+
+    def run(self, df):
+        matrix = CatalogMatrix(df)
+        if not pd.Index(matrix.keys).is_unique:
+            # Results are stored per key; duplicated keys are checked in full
+            self.evaluated_rows, self.changed_rules = len(matrix), [rule.name for rule in self.engine.rules]
+            return self.engine.run(matrix)
+
+        digests = cell_digests(matrix)
+        fingerprints = {rule.name: rule.fingerprint() for rule in self.engine.rules}
+
+        conn = _connect(self.store_path)
+        try:
+            known, previous, stored_rules = self._load(conn, matrix)
+
+            # A row is clean when every one of its cells has the stored digest
+            dirty_rows = np.flatnonzero(~(known & (previous == digests)).all(axis=1))
+            changed = [rule for rule in self.engine.rules if rule.name not in stored_rules or stored_rules[rule.name][0] != fingerprints[rule.name]]
+            unchanged = [rule for rule in self.engine.rules if rule not in changed]
+
+            masks, stats = {}, {}
+            if changed:
+                full = QAEngine(changed).run(matrix)
+                masks.update(full.masks)
+                stats.update(full.stats)
+            if unchanged:
+                partial = QAEngine(unchanged).run(df.iloc[dirty_rows]) if len(dirty_rows) else None
+                for rule in unchanged:
+                    mask = stored_rules[rule.name][1]
+                    stats[rule.name] = RuleStats(rule.name, rule.scope)
+                    if partial is not None:
+                        mask[dirty_rows] = partial.masks[rule.name]
+                        stats[rule.name] = partial.stats[rule.name]
+                    stats[rule.name].hits = int(mask.sum())
+                    masks[rule.name] = mask
+
+            self._save(conn, matrix, digests, masks, fingerprints)
+        finally:
+            conn.close()
+
+        self.evaluated_rows = len(dirty_rows)
+        self.changed_rules = [rule.name for rule in changed]
+        return QAResult(matrix, self.engine.rules, masks, {rule.name: stats[rule.name] for rule in self.engine.rules})
+
+    def _load(self, conn, matrix):
+        """
+        Devuelve (celdas conocidas, digests previos, {regla: (huella, máscara)}),
+        todo alineado con las claves e idiomas actuales.
+        """
+        shape = (len(matrix), len(matrix.languages))
+        stored = conn.execute('SELECT keys, langs, digests FROM qa_cells WHERE scope = ?', (self.scope,)).fetchone()
+        if stored is None:
+            return np.zeros(shape, dtype=bool), np.zeros(shape, dtype=np.int64), {}
+
+        stored_keys, stored_langs = json.loads(stored[0]), json.loads(stored[1])
+        rows = pd.Index(stored_keys).get_indexer(matrix.keys)
+        cols = pd.Index(stored_langs).get_indexer(matrix.languages)
+        stored_shape = (len(stored_keys), len(stored_langs))
+        previous = _align(np.frombuffer(stored[2], dtype=np.int64).reshape(stored_shape), rows, cols, 0)
+        known = _align(np.ones(stored_shape, dtype=bool), rows, cols, False)
+
+        rules = {}
+        scopes = {rule.name: rule.scope for rule in self.engine.rules}
+        for name, fingerprint, hits in conn.execute('SELECT name, fingerprint, hits FROM qa_rules WHERE scope = ?', (self.scope,)):
+            if name not in scopes:
+                continue
+            rule_shape = stored_shape[:1] if scopes[name] == 'key' else stored_shape
+            mask = np.unpackbits(np.frombuffer(hits, dtype=np.uint8), count=int(np.prod(rule_shape))).astype(bool)
+            rules[name] = (fingerprint, _align(mask.reshape(rule_shape), rows, cols, False))
+        return known, previous, rules
+
+    def _save(self, conn, matrix, digests, masks, fingerprints):
+        keys = json.dumps(list(matrix.keys), ensure_ascii=False)
+        langs = json.dumps(matrix.languages, ensure_ascii=False)
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO qa_cells VALUES (?, ?, ?, ?)', (self.scope, keys, langs, digests.tobytes()))
+            conn.execute('DELETE FROM qa_rules WHERE scope = ?', (self.scope,))
+            conn.executemany('INSERT INTO qa_rules VALUES (?, ?, ?, ?)', [
+                (self.scope, name, fingerprint, np.packbits(masks[name].ravel()).tobytes())
+                for name, fingerprint in fingerprints.items()
+            ])
+
+    def summary(self):
+        changed = f"; reglas cambiadas: {', '.join(self.changed_rules)}" if self.changed_rules else ''
+        return f"Filas reevaluadas: {self.evaluated_rows}{changed}"
@@ -0,0 +1,75 @@
+
+from contextlib import ExitStack
+from translation_catalog import LANGUAGE_NAMES
+
+MISSING_TRANSLATION = '**[FALTA TRADUCCIÓN]**'
+MISSING_FILE = '**[ARCHIVO NO ENCONTRADO]**'
+
+# Missing translations are rendered like any other value, inside backticks
+MISSING_TRANSLATION_CELL = f'`{MISSING_TRANSLATION}`'
+
+
+class ReviewView:
+    """
+    Un documento de revisión: idioma base, archivo de salida y cabecera.
+    """
+
+    __slots__ = ('base_lang', 'output_file', 'header')
+
+    def __init__(self, base_lang, output_file, header):
+        self.base_lang = base_lang
+        self.output_file = output_file
+        self.header = header
+
+
+def review_matrix(catalog, languages):
+    """
+    Recorre la matriz clave × idioma una sola vez, en orden de clave.
+
+    Devuelve (celda_clave, celdas) con cada valor ya formateado para la
+    tabla Markdown; las celdas ausentes son MISSING_TRANSLATION_CELL o
+    MISSING_FILE.
+    """
+    present = [catalog.has_language(lang) for lang in languages]
+    for row in catalog.rows(None):
+        cells = []
+        for has_file, value in zip(present, row.values(languages)):
+            if not has_file:
+                cells.append(MISSING_FILE)
+            elif value is None:
+                cells.append(MISSING_TRANSLATION_CELL)
+            else:
+                cells.append(f'`{value}`')
+        yield f'`{row.key}`', cells
+
+
+def render_review_documents(catalog, views, languages=None):
+    """
+    Escribe todas las vistas en una única pasada sobre la matriz.
+
+    Cada fila se escribe directamente en los documentos cuyo idioma base
+    tiene valor para esa clave; ningún documento se acumula en memoria.
+    """
+    languages = catalog.languages if languages is None else languages
+    with ExitStack() as stack:
+        outputs = []
+        for view in views:
+            base = languages.index(view.base_lang)
+            others = [i for i in range(len(languages)) if i != base]
+            base_name = LANGUAGE_NAMES.get(view.base_lang, view.base_lang)
+            header = list(view.header)
+            header.append(f'| Clave | {base_name} (Base) | ' + ' | '.join([LANGUAGE_NAMES.get(languages[i], languages[i]) for i in others]) + ' |')
+            header.append('|' + '|'.join(['---'] * (len(others) + 2)) + '|')
+
+            f = stack.enter_context(open(view.output_file, 'w', encoding='utf-8'))
+            f.write('\n'.join(header))
+            outputs.append((f, base, others))
+
+        for key_cell, cells in review_matrix(catalog, languages):
+            for f, base, others in outputs:
+                base_cell = cells[base]
+                if base_cell is MISSING_TRANSLATION_CELL or base_cell is MISSING_FILE:
+                    continue
+                f.write('\n| ' + ' | '.join([key_cell, base_cell] + [cells[i] for i in others]) + ' |')
+
+    return [view.output_file for view in views]
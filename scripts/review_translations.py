@@ -1,28 +1,28 @@
-
-import pandas as pd
+from pipeline_store import load_stage
+from qa_rules import CONSISTENCY_TERMS, ConsistencyRule, MissingTranslationRule, QAEngine
 
 def review_translations():
-    file_path = "/home/ubuntu/piano-emotion-manager/TRADUCCIONES_CONSOLIDADAS.xlsx"
-    df = pd.read_excel(file_path)
+    df = load_stage("consolidadas")
+
+    consistency_rules = [ConsistencyRule(term_es, term_en) for term_es, term_en in CONSISTENCY_TERMS]
+    result = QAEngine([MissingTranslationRule(), *consistency_rules]).run(df)
     
     # Example of a simple check: find missing translations
-    missing_translations = df[df.isnull().any(axis=1)]
+    missing_translations = df[result.rows("faltantes")]
     if not missing_translations.empty:
         print("Claves con traducciones faltantes:")
         print(missing_translations)
     
     # Example of a consistency check: ensure certain terms are translated consistently
-    def check_consistency(term_es, term_en):
-        inconsistent = df[(df["Español"].str.contains(term_es, na=False)) & (~df["Inglés"].str.contains(term_en, na=False))]
+    for (term_es, _), rule in zip(CONSISTENCY_TERMS, consistency_rules):
+        inconsistent = df[result.rows(rule.name)]
         if not inconsistent.empty:
             print(f"\nInconsistencias encontradas para el término ", term_es, "/")
             print(inconsistent[["Clave", "Español", "Inglés"]])
 
-    check_consistency("factura", "invoice")
-    check_consistency("cliente", "client")
-    check_consistency("piano", "piano")
-
-    # More checks can be added here...
+    # More checks can be added as rules in qa_rules.py
+    print()
+    print(result.format_stats())
 
 if __name__ == "__main__":
     review_translations()
@@ -0,0 +1,286 @@
+
+"""
+Ejecuta el pipeline de traducciones respetando las dependencias entre scripts.
+
+Cada paso declara sus entradas y salidas (archivos o etapas del almacén).
+Un paso solo se vuelve a ejecutar si cambia el hash de sus entradas (incluidos
+el propio script y los módulos de scripts/ que importa, directa o
+indirectamente) o si sus salidas faltan o fueron modificadas; los pasos
+independientes se ejecutan en paralelo.
+
+Uso:
+    python scripts/run_translation_pipeline.py [paso ...] [--jobs N] [--force] [--dry-run] [--list]
+"""
+import argparse
+import ast
+import hashlib
+import json
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pipeline_store import stage_digest
+from translation_catalog import CACHE_DIR, ROOT_DIR
+
+STATE_PATH = CACHE_DIR / 'pipeline_state.json'
+SCRIPTS_DIR = ROOT_DIR / 'scripts'
+
+LOCALE_SOURCES = ('file:locales/*/translations.json', 'file:locales/*/legal.json', 'file:locales/einvoicing.json')
+
+
+def local_modules(script, scripts_dir=SCRIPTS_DIR):
+    """
+    Archivos de scripts/ que `script` importa, directa o indirectamente
+    (también los imports dentro de funciones), ordenados.
+    """
+    found, pending = set(), [script]
+    while pending:
+        tree = ast.parse((scripts_dir / pending.pop()).read_text(encoding='utf-8'))
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                module = f'{name.partition(".")[0]}.py'
+                if module != script and module not in found and (scripts_dir / module).is_file():
+                    found.add(module)
+                    pending.append(module)
+    return sorted(found)
+
+
+class Step:
+    """
+    Un paso del pipeline: un script con sus entradas y salidas.
+
+    Los recursos son 'file:<glob relativo a la raíz>' o 'stage:<etapa>'.
+    El script y los módulos locales que importa son entradas implícitas.
+    Los pasos `manual` solo se ejecutan cuando se piden explícitamente.
+    """
+
+    def __init__(self, name, script, inputs, outputs, manual=False):
+        self.name = name
+        self.script = script
+        modules = [f'file:scripts/{module}' for module in local_modules(script)]
+        self.inputs = list(dict.fromkeys([f'file:scripts/{script}', *modules, *inputs]))
+        self.outputs = list(outputs)
+        self.manual = manual
+
+
+STEPS = [
+    Step('catalogo', 'compiled_catalog.py', LOCALE_SOURCES, ['file:.translation_cache/translations.catalog']),
+    Step('consolidadas', 'generate_translation_xlsx.py',
+         ['file:.translation_cache/translations.catalog'],
+         ['stage:consolidadas', 'file:TRADUCCIONES_CONSOLIDADAS.xlsx']),
+    Step('revision', 'generate_translation_review_all_languages.py',
+         ['file:.translation_cache/translations.catalog'],
+         ['file:DOCUMENTO_REVISION_TRADUCCIONES_*.md']),
+    Step('revision_es', 'generate_translation_review.py',
+         ['file:.translation_cache/translations.catalog'],
+         ['file:DOCUMENTO_REVISION_TRADUCCIONES.md']),
+    Step('errores', 'identify_translation_issues.py', ['stage:consolidadas'], ['stage:errores', 'file:TRADUCCIONES_ERRORES.xlsx']),
+    Step('corregidas', 'apply_translation_fixes.py', ['stage:consolidadas', 'stage:errores'], ['stage:corregidas']),
+    Step('reporte_cambios', 'generate_change_report.py',
+         ['stage:consolidadas', 'stage:corregidas'],
+         ['file:REPORTE_CAMBIOS_TRADUCCIONES.md', 'file:REPORTE_CAMBIOS_TRADUCCIONES.json']),
+    # Paid machine translation: only when requested by name
+    Step('mejoradas_deepl', 'improve_translations_deepl_v2.py', ['stage:consolidadas'], ['stage:mejoradas_deepl'], manual=True),
+    Step('glosario', 'generate_master_glossary.py', ['stage:mejoradas_deepl'], ['file:glosario_maestro.json', 'file:GLOSARIO_MAESTRO_TERMINOS.md']),
+    Step('coherencia', 'check_terminology_consistency.py',
+         ['stage:mejoradas_deepl'],
+         ['file:REPORTE_COHERENCIA_TERMINOLOGICA.md']),
+    Step('analisis_terminologia', 'detailed_terminology_analysis.py',
+         ['stage:mejoradas_deepl'],
+         ['file:ANALISIS_DETALLADO_TERMINOLOGIA.md']),
+    Step('para_revisor', 'apply_terminology_corrections.py',
+         ['stage:mejoradas_deepl', 'file:glosario_maestro.json'],
+         ['stage:corregidas_para_revisor', 'stage:locales_exportados', 'file:TRADUCCIONES_CORREGIDAS_PARA_REVISOR.xlsx',
+          'file:REPORTE_CORRECCIONES_APLICADAS.md']),
+    # Rewrites the app's locales/<lang>.json files: only when requested by name. It reads
+    # the export stages but must not depend on para_revisor, or a returned file would
+    # trigger a new export before the merge
+    Step('actualizar_locales', 'update_translation_files.py',
+         ['file:TRADUCCIONES_PROVEEDOR.xlsx'],
+         ['file:locales/??.json', 'file:REPORTE_ACTUALIZACION_ARCHIVOS.md'], manual=True),
+]
+
+
+def resource_digest(resource):
+    """
+    Hash de un recurso; None si no existe (un glob sin coincidencias cuenta
+    como inexistente).
+    """
+    kind, _, name = resource.partition(':')
+    if kind == 'stage':
+        return stage_digest(name)
+    paths = sorted(path for path in ROOT_DIR.glob(name) if path.is_file())
+    if not paths:
+        return None
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(str(path.relative_to(ROOT_DIR)).encode('utf-8') + b'\0')
+        digest.update(hashlib.sha256(path.read_bytes()).digest())
+    return digest.hexdigest()
+
+
+def resources_digest(resources):
+    digests = {resource: resource_digest(resource) for resource in resources}
+    if any(value is None for value in digests.values()):
+        return None
+    return hashlib.sha256(json.dumps(digests, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def load_state():
+    if STATE_PATH.exists():
+        with open(STATE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(state):
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = STATE_PATH.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    tmp_path.replace(STATE_PATH)
+
+
+def dependencies(steps):
+    """
+    Un paso depende de los pasos que producen alguna de sus entradas.
+    """
+    producers = {}
+    for step in steps:
+        for output in step.outputs:
+            producers[output] = step.name
+    return {
+        step.name: {producers[resource] for resource in step.inputs if resource in producers and producers[resource] != step.name}
+        for step in steps
+    }
+
+
+def select_steps(targets, steps=STEPS):
+    """
+    Los pasos pedidos y todo lo que necesitan aguas arriba. Sin objetivos,
+    todos los pasos no manuales.
+    """
+    by_name = {step.name: step for step in steps}
+    unknown = [target for target in targets if target not in by_name]
+    if unknown:
+        raise SystemExit(f'Pasos desconocidos: {", ".join(unknown)} (disponibles: {", ".join(by_name)})')
+    if not targets:
+        return [step for step in steps if not step.manual]
+
+    deps = dependencies(steps)
+    selected = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name in selected:
+            continue
+        if by_name[name].manual and name not in targets:
+            continue
+        selected.add(name)
+        pending.extend(deps[name])
+    return [step for step in steps if step.name in selected]
+
+
+def is_stale(step, state, force=False):
+    """
+    Devuelve (obsoleto, hash_de_entradas).
+    """
+    inputs = resources_digest(step.inputs)
+    if force or inputs is None:
+        return True, inputs
+    recorded = state.get(step.name)
+    if not recorded or recorded.get('inputs') != inputs:
+        return True, inputs
+    return recorded.get('outputs') != resources_digest(step.outputs), inputs
+
+
+def run_step(step):
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, str(SCRIPTS_DIR / step.script)],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+    )
+    return result, time.perf_counter() - started
+
+
+def run_pipeline(targets=(), jobs=4, force=False, dry_run=False):
+    steps = select_steps(list(targets))
+    names = {step.name for step in steps}
+    deps = {name: required & names for name, required in dependencies(steps).items()}
+    state = load_state()
+
+    done, failed, skipped = set(), set(), set()
+    running = {}
+    remaining = list(steps)
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while remaining or running:
+            for step in list(remaining):
+                if deps[step.name] & (failed | skipped):
+                    print(f'[omitido] {step.name}: falló una dependencia')
+                    remaining.remove(step)
+                    skipped.add(step.name)
+                    continue
+                if not deps[step.name] <= done:
+                    continue
+                remaining.remove(step)
+
+                # Inputs are hashed only once every producer has finished
+                stale, inputs = is_stale(step, state, force)
+                if not stale:
+                    print(f'[al día] {step.name}')
+                    done.add(step.name)
+                    continue
+                if dry_run:
+                    print(f'[pendiente] {step.name} ({step.script})')
+                    done.add(step.name)
+                    continue
+                print(f'[ejecutando] {step.name} ({step.script})')
+                running[pool.submit(run_step, step)] = (step, inputs)
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                step, inputs = running.pop(future)
+                result, elapsed = future.result()
+                outputs = resources_digest(step.outputs)
+                if result.returncode != 0 or outputs is None:
+                    reason = f'código {result.returncode}' if result.returncode != 0 else 'no generó todas sus salidas'
+                    print(f'[error] {step.name} ({reason}, {elapsed:.1f}s)')
+                    print((result.stdout + result.stderr).rstrip())
+                    failed.add(step.name)
+                    continue
+                print(f'[hecho] {step.name} ({elapsed:.1f}s)')
+                state[step.name] = {'inputs': resources_digest(step.inputs) if inputs is None else inputs, 'outputs': outputs}
+                save_state(state)
+                done.add(step.name)
+
+    return not failed and not skipped
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ejecuta solo los pasos obsoletos del pipeline de traducciones.')
+    parser.add_argument('targets', nargs='*', help='Pasos a ejecutar (por defecto todos los no manuales)')
+    parser.add_argument('--jobs', '-j', type=int, default=4, help='Pasos independientes en paralelo (por defecto 4)')
+    parser.add_argument('--force', action='store_true', help='Ejecuta los pasos aunque estén al día')
+    parser.add_argument('--dry-run', action='store_true', help='Muestra qué pasos se ejecutarían')
+    parser.add_argument('--list', action='store_true', help='Lista los pasos y sus dependencias')
+    args = parser.parse_args()
+
+    if args.list:
+        deps = dependencies(STEPS)
+        for step in STEPS:
+            after = ', '.join(sorted(deps[step.name])) or '-'
+            print(f'{step.name:24} {step.script:48} tras: {after}{" (manual)" if step.manual else ""}')
+        sys.exit(0)
+
+    sys.exit(0 if run_pipeline(args.targets, args.jobs, args.force, args.dry_run) else 1)
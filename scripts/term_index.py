@@ -0,0 +1,213 @@
+
+"""
+Índice invertido persistente: por idioma, de cada palabra normalizada a
+las claves que la usan, con frecuencias.
+
+El índice se actualiza de forma incremental: para cada celda (idioma,
+clave) se guarda un hash de su valor y solo se vuelven a tokenizar las
+celdas nuevas o cambiadas. Las frecuencias totales por palabra se ajustan
+con los cambios, de modo que "qué claves usan esta palabra" o "palabras
+más frecuentes" son consultas al índice y no recorridos del corpus.
+
+Con `stemming=True` las palabras se indexan por su forma normalizada de
+term_normalizer (sin acentos y con stemming ligero del idioma), de modo que
+'facturas' y 'factura' cuentan como la misma palabra.
+"""
+import json
+import re
+import sqlite3
+from collections import Counter
+import numpy as np
+import pandas as pd
+from translation_catalog import CACHE_DIR
+from term_normalizer import STEMMER_VERSION, normalizer
+
+INDEX_PATH = CACHE_DIR / 'term_index.sqlite'
+
+# Bump when tokenize() changes: stored postings are rebuilt
+TOKENIZER_VERSION = '1'
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+
+
+def tokenize(text):
+    """
+    Palabras normalizadas de un texto: en minúsculas, separadas por
+    espacios y sin signos de puntuación ('e-mail,' → 'email').
+    """
+    return [token for token in (_PUNCTUATION.sub('', word) for word in text.lower().split()) if token]
+
+
+def _connect(index_path):
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(index_path, timeout=30)
+    conn.executescript(
+        'CREATE TABLE IF NOT EXISTS index_meta ('
+        'scope TEXT PRIMARY KEY, tokenizer TEXT NOT NULL);'
+        # Indexed cells of one language: key order and value hashes (int64)
+        'CREATE TABLE IF NOT EXISTS index_docs ('
+        'scope TEXT NOT NULL, lang TEXT NOT NULL, keys TEXT NOT NULL, digests BLOB NOT NULL, '
+        'PRIMARY KEY (scope, lang));'
+        'CREATE TABLE IF NOT EXISTS index_postings ('
+        'scope TEXT NOT NULL, lang TEXT NOT NULL, token TEXT NOT NULL, key TEXT NOT NULL, tf INTEGER NOT NULL, '
+        'PRIMARY KEY (scope, lang, token, key)) WITHOUT ROWID;'
+        'CREATE INDEX IF NOT EXISTS index_postings_key ON index_postings (scope, lang, key);'
+        # Per token: number of keys using it and total occurrences
+        'CREATE TABLE IF NOT EXISTS index_terms ('
+        'scope TEXT NOT NULL, lang TEXT NOT NULL, token TEXT NOT NULL, '
+        'doc_count INTEGER NOT NULL, total INTEGER NOT NULL, '
+        'PRIMARY KEY (scope, lang, token)) WITHOUT ROWID;'
+    )
+    return conn
+
+
+class TermIndex:
+    """
+    Índice de un catálogo (DataFrame con 'Clave' y una columna por idioma).
+    `scope` separa catálogos distintos en el mismo archivo.
+    """
+
+    def __init__(self, scope, index_path=INDEX_PATH, stemming=False):
+        self.scope = scope
+        self.index_path = index_path
+        self.stemming = stemming
+        self.tokenizer_version = f'{TOKENIZER_VERSION}+stem{STEMMER_VERSION}' if stemming else TOKENIZER_VERSION
+
+    def tokenize(self, lang, text):
+        """
+        Palabras de `text` tal como se indexan en `lang`.
+        """
+        return normalizer(lang).tokens(text) if self.stemming else tokenize(text)
+
+    def update(self, df, key_column="Clave"):
+        """
+        Sincroniza el índice con `df`. Devuelve el número de celdas
+        reindexadas.
+        """
+        keys = df[key_column].to_numpy(dtype=object)
+        if not pd.Index(keys).is_unique:
+            raise ValueError('El índice necesita claves únicas')
+        languages = [column for column in df.columns if column != key_column]
+        conn = _connect(self.index_path)
+        reindexed = 0
+        try:
+            with conn:
+                self._check_tokenizer(conn)
+                for lang in list(self._indexed_languages(conn)):
+                    if lang not in languages:
+                        self._drop_language(conn, lang)
+                for lang in languages:
+                    reindexed += self._update_language(conn, lang, keys, df[lang].to_numpy(dtype=object))
+        finally:
+            conn.close()
+        return reindexed
+
+    def _check_tokenizer(self, conn):
+        stored = conn.execute('SELECT tokenizer FROM index_meta WHERE scope = ?', (self.scope,)).fetchone()
+        if stored is not None and stored[0] != self.tokenizer_version:
+            for lang in list(self._indexed_languages(conn)):
+                self._drop_language(conn, lang)
+        conn.execute('INSERT OR REPLACE INTO index_meta VALUES (?, ?)', (self.scope, self.tokenizer_version))
+
+    def _indexed_languages(self, conn):
+        return [lang for (lang,) in conn.execute('SELECT lang FROM index_docs WHERE scope = ?', (self.scope,))]
+
+    def _drop_language(self, conn, lang):
+        for table in ('index_docs', 'index_postings', 'index_terms'):
+            conn.execute(f'DELETE FROM {table} WHERE scope = ? AND lang = ?', (self.scope, lang))
+
+    def _update_language(self, conn, lang, keys, values):
+        present = pd.notna(values)
+        digests = pd.util.hash_array(values).view(np.int64)
+
+        stored = conn.execute('SELECT keys, digests FROM index_docs WHERE scope = ? AND lang = ?', (self.scope, lang)).fetchone()
+        if stored is None:
+            stored_keys, stored_digests = [], np.zeros(0, dtype=np.int64)
+        else:
+            stored_keys, stored_digests = json.loads(stored[0]), np.frombuffer(stored[1], dtype=np.int64)
+
+        # Current cells that are new or changed; stored cells that are gone or changed
+        keys, values, digests = keys[present], values[present], digests[present]
+        previous = pd.Index(stored_keys, dtype=object).get_indexer(keys)
+        known = previous >= 0
+        changed = ~known
+        changed[known] = stored_digests[previous[known]] != digests[known]
+        kept = np.zeros(len(stored_keys), dtype=bool)
+        kept[previous[~changed]] = True
+        stale = [key for key, keep in zip(stored_keys, kept) if not keep]
+        fresh = list(zip(keys[changed], values[changed]))
+        if not stale and not fresh and stored is not None:
+            return 0
+
+        deltas = {}
+
+        def adjust(token, docs, occurrences):
+            doc_count, total = deltas.get(token, (0, 0))
+            deltas[token] = (doc_count + docs, total + occurrences)
+
+        for key in stale:
+            for token, tf in conn.execute(
+                'SELECT token, tf FROM index_postings WHERE scope = ? AND lang = ? AND key = ?', (self.scope, lang, key)
+            ).fetchall():
+                adjust(token, -1, -tf)
+        conn.executemany('DELETE FROM index_postings WHERE scope = ? AND lang = ? AND key = ?',
+                         [(self.scope, lang, key) for key in stale])
+
+        postings = []
+        for key, value in fresh:
+            for token, tf in Counter(self.tokenize(lang, str(value))).items():
+                postings.append((self.scope, lang, token, key, tf))
+                adjust(token, 1, tf)
+        conn.executemany('INSERT INTO index_postings VALUES (?, ?, ?, ?, ?)', postings)
+
+        conn.executemany(
+            'INSERT INTO index_terms VALUES (?, ?, ?, ?, ?) ON CONFLICT (scope, lang, token) '
+            'DO UPDATE SET doc_count = doc_count + excluded.doc_count, total = total + excluded.total',
+            [(self.scope, lang, token, doc_count, total) for token, (doc_count, total) in deltas.items() if doc_count or total],
+        )
+        conn.execute('DELETE FROM index_terms WHERE scope = ? AND lang = ? AND doc_count <= 0', (self.scope, lang))
+        conn.execute('INSERT OR REPLACE INTO index_docs VALUES (?, ?, ?, ?)', (
+            self.scope, lang, json.dumps(list(keys), ensure_ascii=False), digests.tobytes(),
+        ))
+        return len(fresh)
+
+    def _query(self, sql, params):
+        conn = _connect(self.index_path)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def keys_for(self, lang, token):
+        """
+        {clave: frecuencia} de las claves cuyo valor en `lang` contiene la palabra.
+        """
+        return dict(self._query(
+            'SELECT key, tf FROM index_postings WHERE scope = ? AND lang = ? AND token = ?',
+            (self.scope, lang, token),
+        ))
+
+    def keys_with(self, lang, text):
+        """
+        Claves cuyo valor en `lang` contiene todas las palabras de `text`.
+        """
+        tokens = set(self.tokenize(lang, text))
+        if not tokens:
+            return set()
+        rows = self._query(
+            f'SELECT key FROM index_postings WHERE scope = ? AND lang = ? AND token IN ({", ".join("?" * len(tokens))}) '
+            f'GROUP BY key HAVING COUNT(*) = ?',
+            (self.scope, lang, *tokens, len(tokens)),
+        )
+        return {key for (key,) in rows}
+
+    def top_tokens(self, lang, limit=10, min_length=1):
+        """
+        [(palabra, apariciones)] más frecuentes en `lang`; a igual frecuencia,
+        por orden alfabético.
+        """
+        return self._query(
+            'SELECT token, total FROM index_terms WHERE scope = ? AND lang = ? AND length(token) >= ? '
+            'ORDER BY total DESC, token LIMIT ?',
+            (self.scope, lang, min_length, limit),
+        )
@@ -0,0 +1,135 @@
+
+"""
+Búsqueda simultánea de muchos términos (autómata de Aho–Corasick).
+
+El autómata se construye una vez con todas las formas de los términos y
+recorre cada texto en una sola pasada, con un coste lineal en la longitud
+del texto e independiente del número de términos, así que el glosario
+puede crecer a miles de entradas. Cada forma (p. ej. 'invoice', 'invoices')
+apunta a su término; se informan todas las apariciones, también las que se
+solapan.
+"""
+from collections import deque
+
+
+def _is_word_char(char):
+    # Same definition as \w in Python's re module
+    return char.isalnum() or char == '_'
+
+
+class TermMatcher:
+    """
+    Autómata de términos.
+
+    `terms` es un iterable de términos o un dict forma → término.
+    Con `whole_words` solo cuentan las apariciones delimitadas como con
+    \\b en una expresión regular. `normalize` sustituye a la conversión a
+    minúsculas y se aplica igual a las formas y a los textos (p. ej. un
+    term_normalizer.Normalizer); las posiciones devueltas son entonces las
+    del texto normalizado.
+    """
+
+    def __init__(self, terms=(), case_sensitive=False, whole_words=False, normalize=None):
+        self.case_sensitive = case_sensitive
+        self.whole_words = whole_words
+        self.normalize = normalize
+        self._forms = {}
+        self._goto = None
+        self._cache = {}
+        items = terms.items() if isinstance(terms, dict) else ((term, term) for term in terms)
+        for form, term in items:
+            self.add(form, term)
+
+    def __repr__(self):
+        # Terms are left out on purpose: each term's matches do not depend on the others
+        return f'TermMatcher(case_sensitive={self.case_sensitive}, whole_words={self.whole_words}, normalize={self.normalize!r})'
+
+    def __len__(self):
+        return len(self._forms)
+
+    def _normalize(self, text):
+        if self.normalize is not None:
+            return self.normalize(text)
+        return text if self.case_sensitive else text.lower()
+
+    def add(self, form, term=None):
+        """
+        Añade una forma que cuenta como aparición de `term` (por defecto, la
+        propia forma).
+        """
+        normalized = self._normalize(form)
+        if not normalized:
+            raise ValueError(f'Un término no puede estar vacío: {form!r}')
+        self._forms.setdefault(normalized, set()).add(form if term is None else term)
+        self._goto = None
+        self._cache.clear()
+
+    def _build(self):
+        goto, fail, outputs = [{}], [0], [()]
+        for form, terms in self._forms.items():
+            node = 0
+            for char in form:
+                if char not in goto[node]:
+                    goto.append({})
+                    fail.append(0)
+                    outputs.append(())
+                    goto[node][char] = len(goto) - 1
+                node = goto[node][char]
+            outputs[node] = outputs[node] + tuple((len(form), term) for term in sorted(terms))
+
+        # Breadth-first failure links; each node also inherits the outputs of its failure node
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(char, 0) if goto[state].get(char, 0) != child else 0
+                outputs[child] = outputs[child] + outputs[fail[child]]
+        self._goto, self._fail, self._outputs = goto, fail, outputs
+
+    def finditer(self, text):
+        """
+        Genera (inicio, fin, término) para cada aparición en `text`.
+        """
+        if self._goto is None:
+            self._build()
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        haystack = self._normalize(text)
+        node = 0
+        for end, char in enumerate(haystack, 1):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length, term in outputs[node]:
+                start = end - length
+                if self.whole_words and (
+                    (start > 0 and _is_word_char(haystack[start - 1]))
+                    or (end < len(haystack) and _is_word_char(haystack[end]))
+                ):
+                    continue
+                yield start, end, term
+
+    def terms_in(self, text):
+        """
+        Conjunto de términos presentes en `text` (cacheado por texto: los
+        mismos valores se repiten entre claves e idiomas).
+        """
+        found = self._cache.get(text)
+        if found is None:
+            found = self._cache[text] = frozenset(term for _, _, term in self.finditer(text))
+        return found
+
+    def scan(self, values):
+        """
+        Recorre una columna una vez. Devuelve {término: [índices de fila]};
+        los valores que no son texto se ignoran.
+        """
+        rows = {}
+        for index, value in enumerate(values):
+            if isinstance(value, str):
+                for term in self.terms_in(value):
+                    rows.setdefault(term, []).append(index)
+        return rows
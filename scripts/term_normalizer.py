@@ -0,0 +1,153 @@
+
+"""
+Normalización de términos por idioma: minúsculas, sin acentos y con un
+stemming ligero (plurales, artículos pospuestos y terminaciones de caso
+más comunes), para que 'facturas', 'Rechnungen' o 'kunderna' coincidan con
+'factura', 'Rechnung' o 'kund'.
+
+El resultado se memoriza por palabra única: un catálogo repite las mismas
+palabras miles de veces. Los normalizadores se pueden pasar a TermMatcher
+(`normalize=`) para buscar todos los términos del glosario en una sola
+pasada sobre las palabras normalizadas.
+"""
+import re
+import unicodedata
+from translation_catalog import LANGUAGE_NAMES
+
+# Bump when the folding or the suffix rules change
+STEMMER_VERSION = '1'
+
+MIN_STEM = 3
+
+_WORD = re.compile(r'\w+')
+
+# Spanish language name → code, so column names work as well as codes
+_CODES = {name: code for code, name in LANGUAGE_NAMES.items()}
+
+# Suffix rules per language, tried longest first: (suffix, replacement)
+_ROMANCE_VOWELS = ('a', 'e', 'i', 'o')
+SUFFIX_RULES = {
+    'en': [("'s", ''), ('ies', 'y'), ('s', '')],
+    'es': [('es', ''), ('s', '')],
+    'pt': [('oes', 'ao'), ('aes', 'ao'), ('es', ''), ('s', '')],
+    'fr': [('s', ''), ('x', '')],
+    'it': [],
+    'de': [('ern', 'er'), ('en', ''), ('es', ''), ('e', ''), ('s', '')],
+    'da': [('erne', ''), ('ere', ''), ('ene', ''), ('er', ''), ('en', ''), ('et', ''), ('e', '')],
+    'no': [('ere', ''), ('ene', ''), ('er', ''), ('en', ''), ('et', ''), ('e', '')],
+    'sv': [('orna', ''), ('arna', ''), ('erna', ''), ('or', ''), ('ar', ''), ('er', ''), ('an', ''), ('en', ''), ('et', ''), ('na', ''), ('a', ''), ('e', ''), ('n', '')],
+}
+
+# Romance languages also drop the final vowel (factura/facturas → factur)
+_STRIP_FINAL_VOWEL = {'es', 'pt', 'fr', 'it'}
+
+# English plurals that are not "+s"
+_EN_KEEP = ('ss', 'us', 'is')
+
+
+def language_code(lang):
+    """
+    Código de idioma a partir del código o del nombre en español ('Inglés').
+    """
+    return _CODES.get(lang, lang)
+
+
+def fold(text):
+    """
+    Minúsculas y sin marcas diacríticas ('Afinación' → 'afinacion').
+    Letras como 'ø' o 'æ', que no se descomponen, se conservan.
+    """
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def stem(token, lang):
+    """
+    Stemming ligero de una palabra ya plegada con fold().
+    """
+    lang = language_code(lang)
+    if lang == 'en' and token.endswith(_EN_KEEP):
+        return token
+    for suffix, replacement in SUFFIX_RULES.get(lang, ()):
+        if token.endswith(suffix) and len(token) - len(suffix) + len(replacement) >= MIN_STEM:
+            token = token[:len(token) - len(suffix)] + replacement
+            break
+    if lang in _STRIP_FINAL_VOWEL and token.endswith(_ROMANCE_VOWELS) and len(token) > MIN_STEM:
+        token = token[:-1]
+    return token
+
+
+class Folder:
+    """
+    Normalizador solo de mayúsculas y acentos, carácter a carácter: sirve
+    para búsquedas de subcadenas (p. ej. términos dentro de claves).
+    """
+
+    def __init__(self):
+        self._cache = {}
+
+    def __repr__(self):
+        return f'Folder(version={STEMMER_VERSION})'
+
+    def __call__(self, text):
+        folded = self._cache.get(text)
+        if folded is None:
+            folded = self._cache[text] = fold(text)
+        return folded
+
+
+class Normalizer:
+    """
+    Normalizador de un idioma: divide en palabras, las pliega y aplica el
+    stemming. Llamado sobre un texto devuelve las palabras normalizadas
+    separadas por un espacio.
+    """
+
+    def __init__(self, lang, stemming=True):
+        self.lang = language_code(lang)
+        self.stemming = stemming
+        self._tokens = {}
+
+    def __repr__(self):
+        return f'Normalizer(lang={self.lang!r}, stemming={self.stemming}, version={STEMMER_VERSION})'
+
+    def token(self, word):
+        """
+        Forma normalizada de una palabra (memorizada).
+        """
+        normalized = self._tokens.get(word)
+        if normalized is None:
+            normalized = fold(word)
+            if self.stemming:
+                normalized = stem(normalized, self.lang)
+            self._tokens[word] = normalized
+        return normalized
+
+    def tokens(self, text):
+        return [self.token(word) for word in _WORD.findall(text)]
+
+    def spans(self, text):
+        """
+        (inicio, fin) en `text` de cada palabra, alineados con tokens().
+        """
+        return [match.span() for match in _WORD.finditer(text)]
+
+    def __call__(self, text):
+        return ' '.join(self.tokens(text))
+
+
+_normalizers = {}
+
+
+def normalizer(lang, stemming=True):
+    """
+    Normalizador compartido de un idioma, para que su caché de palabras se
+    reutilice entre scripts y búsquedas.
+    """
+    key = (language_code(lang), stemming)
+    if key not in _normalizers:
+        _normalizers[key] = Normalizer(*key)
+    return _normalizers[key]
+
+
+folder = Folder()
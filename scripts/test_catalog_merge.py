@@ -0,0 +1,54 @@
+import pandas as pd
+from catalog_merge import changed_rows, three_way_merge
+
+LANGUAGES = ["Español", "Alemán"]
+
+
+def catalog(rows):
+    return pd.DataFrame(rows, columns=["Clave", *LANGUAGES])
+
+
+def cell(frame, key, lang):
+    return frame.set_index("Clave").at[key, lang]
+
+
+def test_pipeline_corrections_land_when_vendor_leaves_rows_untouched():
+    # Locales when the export was made
+    base = catalog([(f"k{i}", f"es {i}", f"de {i}") for i in range(100)])
+    # Export: the pipeline corrected every tenth row
+    exported = base.copy()
+    exported.loc[::10, "Alemán"] = [f"de {i} korrigiert" for i in range(0, 100, 10)]
+    # The vendor edits a single row and returns the rest untouched
+    vendor = exported.copy()
+    vendor.loc[vendor["Clave"] == "k5", "Alemán"] = "de 5 vom Anbieter"
+    # Meanwhile the repo changed one corrected row and one untouched row
+    current = base.copy()
+    current.loc[current["Clave"] == "k20", "Alemán"] = "de 20 im Repo"
+    current.loc[current["Clave"] == "k7", "Alemán"] = "de 7 im Repo"
+
+    result = three_way_merge(base, vendor, current, languages=LANGUAGES)
+    merged = result.merged
+
+    assert changed_rows(exported, vendor, languages=LANGUAGES) == 1
+    assert result.rows_changed == 11
+    for i in range(0, 100, 10):
+        if i != 20:
+            assert cell(merged, f"k{i}", "Alemán") == f"de {i} korrigiert"
+    assert cell(merged, "k5", "Alemán") == "de 5 vom Anbieter"
+    assert cell(merged, "k7", "Alemán") == "de 7 im Repo"
+    assert cell(merged, "k1", "Alemán") == "de 1"
+    assert len(result.applied) == 10
+    assert result.conflicts[["Clave", "Idioma"]].values.tolist() == [["k20", "Alemán"]]
+    assert cell(merged, "k20", "Alemán") == "de 20 im Repo"
+
+
+def test_keys_missing_from_vendor_copy_are_kept():
+    base = catalog([("a", "uno", "eins"), ("b", "dos", "zwei")])
+    vendor = catalog([("a", "uno", "eins!")])
+    current = base.copy()
+
+    result = three_way_merge(base, vendor, current, languages=LANGUAGES)
+
+    assert result.merged["Clave"].tolist() == ["a", "b"]
+    assert cell(result.merged, "a", "Alemán") == "eins!"
+    assert cell(result.merged, "b", "Alemán") == "zwei"
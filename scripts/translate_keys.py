@@ -1,46 +1,60 @@
 
 import json
-from deep_translator import GoogleTranslator
+from machine_translation import AsyncTranslationClient, GoogleBackend, ProgressReporter
+from mt_journal import TranslationJournal
+from translation_memory import TranslationMemory
+from translation_catalog import LOCALES_DIR, ROOT_DIR, load_flat_json
 
 def translate_missing_keys(missing_keys_file, base_lang_file, locales_dir):
     with open(missing_keys_file, 'r') as f:
         missing_keys_data = json.load(f)
 
-    with open(base_lang_file, 'r') as f:
-        base_translations = json.load(f)
-
-    for lang, keys in missing_keys_data.items():
-        print(f'Translating for {lang}...')
-        translator = GoogleTranslator(source='es', target=lang)
+    flat_base = load_flat_json(base_lang_file)
+    # An interrupted run resumes from its journal
+    journal = TranslationJournal('translate_keys')
+    client = AsyncTranslationClient(GoogleBackend(source_lang='es'), memory=TranslationMemory(), journal=journal)
+
+    # Missing strings of every language, translated concurrently in batched requests
+    jobs = {
+        lang: {key: flat_base[key] for key in keys if isinstance(flat_base.get(key), str)}
+        for lang, keys in missing_keys_data.items()
+    }
+    print(f'Translating {sum(len(sources) for sources in jobs.values())} strings for {len(jobs)} languages...')
+    results = client.run(jobs, progress=ProgressReporter())
+    print(client.summary())
+
+    for lang, sources in jobs.items():
         lang_file_path = f'{locales_dir}/{lang}/translations.json'
 
         with open(lang_file_path, 'r') as f:
             lang_translations = json.load(f)
 
-        for key in keys:
+        translations, errors = results[lang]
+        for key, error in errors.items():
+            print(f'Could not translate {key}: {error}')
+
+        for key in sources:
+            if key not in translations:
+                continue
+            translated_text = translations[key]
             nested_keys = key.split('.')
-            base_value = base_translations
-            for nested_key in nested_keys:
-                base_value = base_value.get(nested_key, {})
-
-            if isinstance(base_value, str):
-                translated_text = translator.translate(base_value)
-                
-                temp_translations = lang_translations
-                for i, nested_key in enumerate(nested_keys):
-                    if i == len(nested_keys) - 1:
-                        temp_translations[nested_key] = translated_text
-                    else:
-                        temp_translations = temp_translations.setdefault(nested_key, {})
+            temp_translations = lang_translations
+            for i, nested_key in enumerate(nested_keys):
+                if i == len(nested_keys) - 1:
+                    temp_translations[nested_key] = translated_text
+                else:
+                    temp_translations = temp_translations.setdefault(nested_key, {})
 
         with open(lang_file_path, 'w') as f:
             json.dump(lang_translations, f, ensure_ascii=False, indent=2)
 
         print(f'Finished translating for {lang}.')
 
+    journal.finish()
+
 if __name__ == '__main__':
     translate_missing_keys(
-        '/home/ubuntu/piano-emotion-manager/scripts/missing_keys.json',
-        '/home/ubuntu/piano-emotion-manager/locales/es/translations.json',
-        '/home/ubuntu/piano-emotion-manager/locales'
+        ROOT_DIR / 'scripts' / 'missing_keys.json',
+        LOCALES_DIR / 'es' / 'translations.json',
+        LOCALES_DIR
     )
@@ -1,54 +1,46 @@
 
 import json
-from deep_translator import GoogleTranslator
+from machine_translation import AsyncTranslationClient, GoogleBackend, ProgressReporter
+from mt_journal import TranslationJournal
+from translation_memory import TranslationMemory
+from mt_state import TranslationState
+from translation_catalog import BASE_LANG, LOCALES_DIR, load_locale, unflatten_dict
 
 def translate_swedish():
-    base_lang_file = '/home/ubuntu/piano-emotion-manager/locales/es/translations.json'
-    sv_file = '/home/ubuntu/piano-emotion-manager/locales/sv/translations.json'
-
-    with open(base_lang_file, 'r', encoding='utf-8') as f:
-        base_translations = json.load(f)
-
-    with open(sv_file, 'r', encoding='utf-8') as f:
-        sv_translations = json.load(f)
-
-    translator = GoogleTranslator(source='es', target='sv')
-
-    def flatten_dict(d, parent_key='', sep='.'):
-        items = []
-        for k, v in d.items():
-            new_key = f"{parent_key}{sep}{k}" if parent_key else k
-            if isinstance(v, dict):
-                items.extend(flatten_dict(v, new_key, sep=sep).items())
-            else:
-                items.append((new_key, v))
-        return dict(items)
-
-    def unflatten_dict(d, sep='.'):
-        result = {}
-        for key, value in d.items():
-            parts = key.split(sep)
-            current = result
-            for part in parts[:-1]:
-                if part not in current:
-                    current[part] = {}
-                current = current[part]
-            current[parts[-1]] = value
-        return result
-
-    flat_base = flatten_dict(base_translations)
-    flat_sv = flatten_dict(sv_translations)
-
-    for key, value in flat_base.items():
-        if key not in flat_sv:
-            print(f'Translating {key}...')
-            translated_text = translator.translate(value)
-            flat_sv[key] = translated_text
+    sv_file = LOCALES_DIR / 'sv' / 'translations.json'
+
+    flat_base = load_locale(BASE_LANG)
+    flat_sv = load_locale('sv')
+
+    # An interrupted run resumes from its journal
+    journal = TranslationJournal('translate_swedish')
+    client = AsyncTranslationClient(GoogleBackend(source_lang='es'), memory=TranslationMemory(), journal=journal)
+
+    # Missing keys and keys whose Spanish changed since they were machine-translated.
+    # Existing Swedish is treated as human work: it is locked, never overwritten
+    state = TranslationState('locales')
+    keys = [key for key, value in flat_base.items() if isinstance(value, str)]
+    plan = state.plan('sv', keys, [flat_base[key] for key in keys], [flat_sv.get(key) for key in keys],
+                      lock_untracked=True)
+    print(plan.summary())
+    for key in plan.keys[plan.review]:
+        print(f'Review {key}: the Spanish changed and the Swedish was edited by hand')
+
+    # Batched, concurrent requests; written in base order
+    missing = plan.sources_to_translate()
+    print(f'Translating {len(missing)} keys...')
+    translations, errors = client.run({'sv': missing}, progress=ProgressReporter())['sv']
+    print(client.summary())
+    for key, error in errors.items():
+        print(f'Could not translate {key}: {error}')
+    flat_sv.update((key, translations[key]) for key in missing if key in translations)
 
     sv_translations = unflatten_dict(flat_sv)
 
     with open(sv_file, 'w', encoding='utf-8') as f:
         json.dump(sv_translations, f, ensure_ascii=False, indent=2)
+    state.save(plan, translations, [flat_sv.get(key) for key in keys])
+    journal.finish()
 
     print('Swedish translation completed.')
 
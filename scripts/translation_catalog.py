@@ -0,0 +1,282 @@
+
+import hashlib
+import json
+import os
+import pickle
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+LOCALES_DIR = ROOT_DIR / 'locales'
+CACHE_DIR = ROOT_DIR / '.translation_cache'
+BASE_LANG = 'es'
+
+# Bump when the flattened representation changes to invalidate cached entries
+FLAT_CACHE_VERSION = b'flat-v1\n'
+
+# Language names
+LANGUAGE_NAMES = {
+    'da': 'Danés',
+    'de': 'Alemán',
+    'en': 'Inglés',
+    'es': 'Español',
+    'fr': 'Francés',
+    'it': 'Italiano',
+    'no': 'Noruego',
+    'pt': 'Portugués',
+    'sv': 'Sueco'
+}
+
+
+def flatten_dict(d, parent_key='', sep='.'):
+    """
+    Aplana un diccionario anidado a claves con puntos ('common.save').
+    """
+    items = {}
+    for k, v in d.items():
+        new_key = f"{parent_key}{sep}{k}" if parent_key else k
+        if isinstance(v, dict):
+            items.update(flatten_dict(v, new_key, sep=sep))
+        else:
+            items[new_key] = v
+    return items
+
+
+def unflatten_dict(d, sep='.'):
+    """
+    Operación inversa de flatten_dict.
+    """
+    result = {}
+    for key, value in d.items():
+        parts = key.split(sep)
+        current = result
+        for part in parts[:-1]:
+            current = current.setdefault(part, {})
+        current[parts[-1]] = value
+    return result
+
+
+def list_languages(locales_dir=LOCALES_DIR):
+    return sorted(d for d in os.listdir(locales_dir) if os.path.isdir(Path(locales_dir) / d))
+
+
+def load_flat_json(path, use_cache=True):
+    """
+    Carga y aplana un archivo JSON usando la caché en disco.
+
+    La caché guarda el diccionario ya aplanado bajo el hash SHA-256 del
+    contenido del archivo, así que se invalida sola cuando el archivo cambia.
+    """
+    data = Path(path).read_bytes()
+    if not use_cache:
+        return flatten_dict(json.loads(data))
+
+    digest = hashlib.sha256(FLAT_CACHE_VERSION + data).hexdigest()
+    cache_file = CACHE_DIR / 'flat' / f'{digest}.pickle'
+    try:
+        with open(cache_file, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        pass
+
+    flat = flatten_dict(json.loads(data))
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = cache_file.with_suffix(f'.{os.getpid()}.tmp')
+    with open(tmp_file, 'wb') as f:
+        pickle.dump(flat, f, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp_file.replace(cache_file)
+    return flat
+
+
+def load_locale(lang, locales_dir=LOCALES_DIR, namespace='translations'):
+    """
+    Carga y aplana `locales/<lang>/<namespace>.json`. Devuelve None si no existe.
+    """
+    lang_file = Path(locales_dir) / lang / f'{namespace}.json'
+    if not lang_file.exists():
+        return None
+    return load_flat_json(lang_file)
+
+
+def load_app_locales(lang_map, locales_dir=LOCALES_DIR):
+    """
+    Lee los `locales/<código>.json` planos de la app para {nombre: código}.
+    Devuelve ({nombre: dict}, DataFrame con 'Clave' y una columna por
+    nombre); un archivo que falta cuenta como vacío.
+    """
+    import pandas as pd
+
+    current = {}
+    for lang_name, lang_code in lang_map.items():
+        file_path = Path(locales_dir) / f'{lang_code}.json'
+        if file_path.exists():
+            with open(file_path, 'r', encoding='utf-8') as f:
+                current[lang_name] = json.load(f)
+        else:
+            current[lang_name] = {}
+    keys = list(dict.fromkeys(key for translations in current.values() for key in translations))
+    frame = pd.DataFrame({'Clave': pd.Series(keys, dtype=object)})
+    for lang_name, translations in current.items():
+        frame[lang_name] = pd.Series(translations, dtype=object).reindex(keys).to_numpy(dtype=object)
+    return current, frame
+
+
+class CatalogRow:
+    """
+    Vista ligera de una fila del catálogo (una clave en todos los idiomas).
+    """
+
+    __slots__ = ('catalog', 'slot')
+
+    def __init__(self, catalog, slot):
+        self.catalog = catalog
+        self.slot = slot
+
+    @property
+    def key(self):
+        return self.catalog.key_table[self.slot]
+
+    def __getitem__(self, lang):
+        column = self.catalog.columns[lang]
+        return None if column is None else column[self.slot]
+
+    def get(self, lang, default=None):
+        value = self[lang] if lang in self.catalog.columns else None
+        return default if value is None else value
+
+    def values(self, languages=None):
+        languages = self.catalog.languages if languages is None else languages
+        return [self[lang] for lang in languages]
+
+
+class TranslationCatalog:
+    """
+    Catálogo columnar: una tabla de claves internadas y una columna de
+    valores por idioma, indexadas por la misma posición (slot).
+
+    `columns[lang]` es None si el archivo del idioma no existe; las claves
+    que faltan en un idioma tienen None en su slot.
+    """
+
+    def __init__(self, languages=()):
+        self.languages = []
+        self.key_table = []
+        self.slots = {}
+        self.columns = {}
+        self._sorted_slots = None
+        for lang in languages:
+            self.add_language(lang, None)
+
+    def __len__(self):
+        return len(self.key_table)
+
+    def _slot_for(self, key):
+        slot = self.slots.get(key)
+        if slot is None:
+            slot = len(self.key_table)
+            key = sys.intern(key)
+            self.key_table.append(key)
+            self.slots[key] = slot
+            for column in self.columns.values():
+                if column is not None:
+                    column.append(None)
+            self._sorted_slots = None
+        return slot
+
+    def add_language(self, lang, flat):
+        """
+        Añade (o reemplaza) la columna de un idioma a partir de un
+        diccionario plano clave → valor. `flat` None marca el idioma como
+        sin archivo.
+        """
+        if lang not in self.columns:
+            self.languages.append(lang)
+        if flat is None:
+            self.columns[lang] = None
+            return
+        self.columns[lang] = [None] * len(self.key_table)
+        for key, value in flat.items():
+            slot = self._slot_for(key)
+            self.columns[lang][slot] = sys.intern(value) if isinstance(value, str) else value
+
+    def has_language(self, lang):
+        return self.columns.get(lang) is not None
+
+    def slot(self, key):
+        return self.slots.get(key)
+
+    def row(self, key):
+        slot = self.slots.get(key)
+        return None if slot is None else CatalogRow(self, slot)
+
+    def sorted_slots(self):
+        if self._sorted_slots is None:
+            self._sorted_slots = sorted(range(len(self.key_table)), key=self.key_table.__getitem__)
+        return self._sorted_slots
+
+    def keys(self, lang=BASE_LANG):
+        column = self.columns[lang]
+        return [self.key_table[slot] for slot in self.sorted_slots() if column[slot] is not None]
+
+    def get(self, key, lang, default=None):
+        slot = self.slots.get(key)
+        column = self.columns.get(lang)
+        if slot is None or column is None or column[slot] is None:
+            return default
+        return column[slot]
+
+    def rows(self, base_lang=BASE_LANG):
+        """
+        Recorre en orden de clave las filas presentes en el idioma base
+        (todas las claves si `base_lang` es None).
+        """
+        column = self.columns[base_lang] if base_lang is not None else None
+        for slot in self.sorted_slots():
+            if column is None or column[slot] is not None:
+                yield CatalogRow(self, slot)
+
+    @classmethod
+    def from_frame(cls, df, key_column='Clave'):
+        """
+        Construye el catálogo desde un DataFrame con columnas 'Clave' y los
+        nombres de idioma en español ('Español', 'Inglés', ...).
+        """
+        codes = {name: code for code, name in LANGUAGE_NAMES.items()}
+        catalog = cls()
+        keys = [str(key) for key in df[key_column].tolist()]
+        for key in keys:
+            catalog._slot_for(key)
+        for name in df.columns:
+            if name == key_column:
+                continue
+            column = [None] * len(catalog.key_table)
+            for key, value in zip(keys, df[name].tolist()):
+                if isinstance(value, str):
+                    column[catalog.slots[key]] = sys.intern(value)
+                elif value is not None and value == value:  # NaN != NaN
+                    column[catalog.slots[key]] = value
+            lang = codes.get(name, name)
+            catalog.languages.append(lang)
+            catalog.columns[lang] = column
+        return catalog
+
+    def to_frame(self, key_column='Clave'):
+        import pandas as pd
+
+        slots = self.sorted_slots()
+        data = {key_column: [self.key_table[slot] for slot in slots]}
+        for lang in self.languages:
+            column = self.columns[lang] or [None] * len(self.key_table)
+            data[LANGUAGE_NAMES.get(lang, lang)] = [column[slot] for slot in slots]
+        return pd.DataFrame(data)
+
+
+def load_catalog(locales_dir=LOCALES_DIR, languages=None, namespace='translations'):
+    """
+    Carga todos los idiomas de `locales_dir` en un TranslationCatalog.
+    """
+    languages = list_languages(locales_dir) if languages is None else languages
+    catalog = TranslationCatalog()
+    for lang in languages:
+        catalog.add_language(lang, load_locale(lang, locales_dir, namespace))
+    return catalog
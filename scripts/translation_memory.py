@@ -0,0 +1,130 @@
+
+"""
+Memoria de traducción persistente (SQLite).
+
+Cada traducción se guarda con la clave (hash del texto de origen
+normalizado, idioma de destino, motor, versión del glosario), así que un
+texto ya traducido no se vuelve a pedir al servicio en ejecuciones
+posteriores. Cambiar de motor (o de idioma de origen) o cambiar las
+traducciones del glosario maestro da claves nuevas.
+
+La normalización solo afecta a la búsqueda: forma Unicode NFC y sin
+espacios en los extremos. Los espacios del texto original se restituyen
+alrededor de la traducción guardada.
+"""
+import hashlib
+import json
+import sqlite3
+import time
+import unicodedata
+from translation_catalog import CACHE_DIR, ROOT_DIR
+
+MEMORY_PATH = CACHE_DIR / 'translation_memory.sqlite'
+GLOSSARY_PATH = ROOT_DIR / 'glosario_maestro.json'
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_CHUNK = 500
+
+
+def normalize_source(text):
+    return unicodedata.normalize('NFC', text).strip()
+
+
+def source_hash(text):
+    return hashlib.sha256(normalize_source(text).encode('utf-8')).hexdigest()
+
+
+def restore_spaces(text, translation):
+    """
+    Pone alrededor de `translation` los espacios de los extremos de `text`.
+    """
+    if not text.strip():
+        return text
+    return text[:len(text) - len(text.lstrip())] + translation + text[len(text.rstrip()):]
+
+
+def glossary_version(path=GLOSSARY_PATH):
+    """
+    Hash de las traducciones del glosario maestro (las notas y el contexto no
+    cuentan); '' si no hay glosario.
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            glossary = json.load(f)
+    except FileNotFoundError:
+        return ''
+    translations = {term: data.get('translations', {}) for term, data in glossary.items()}
+    canonical = json.dumps(translations, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+def _connect(memory_path):
+    memory_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(memory_path, timeout=30)
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS translation_memory ('
+        'source_hash TEXT NOT NULL, target_lang TEXT NOT NULL, engine TEXT NOT NULL, glossary TEXT NOT NULL, '
+        'source TEXT NOT NULL, translation TEXT NOT NULL, created REAL NOT NULL, '
+        'PRIMARY KEY (source_hash, target_lang, engine, glossary)) WITHOUT ROWID'
+    )
+    return conn
+
+
+class TranslationMemory:
+    """
+    Memoria de traducción de un archivo. `glossary` es la versión del
+    glosario con la que se traduce (por defecto, la del glosario maestro
+    actual).
+    """
+
+    def __init__(self, memory_path=MEMORY_PATH, glossary=None):
+        self.memory_path = memory_path
+        self.glossary = glossary_version() if glossary is None else glossary
+
+    def __repr__(self):
+        return f'TranslationMemory({str(self.memory_path)!r}, glossary={self.glossary!r})'
+
+    def lookup(self, engine, target_lang, texts):
+        """
+        {texto: traducción} de los textos que ya están en la memoria.
+        """
+        hashes = {}
+        for text in texts:
+            hashes.setdefault(source_hash(text), []).append(text)
+        found = {}
+        conn = _connect(self.memory_path)
+        try:
+            digests = list(hashes)
+            for start in range(0, len(digests), _LOOKUP_CHUNK):
+                chunk = digests[start:start + _LOOKUP_CHUNK]
+                rows = conn.execute(
+                    f'SELECT source_hash, translation FROM translation_memory '
+                    f'WHERE target_lang = ? AND engine = ? AND glossary = ? '
+                    f'AND source_hash IN ({", ".join("?" * len(chunk))})',
+                    (target_lang, engine, self.glossary, *chunk),
+                )
+                for digest, translation in rows:
+                    for text in hashes[digest]:
+                        found[text] = restore_spaces(text, translation)
+        finally:
+            conn.close()
+        return found
+
+    def store(self, engine, target_lang, pairs):
+        """
+        Guarda [(texto, traducción)]; la traducción se guarda sin los
+        espacios de los extremos que rodeaban al texto.
+        """
+        now = time.time()
+        rows = [
+            (source_hash(text), target_lang, engine, self.glossary, normalize_source(text), translation.strip(), now)
+            for text, translation in pairs
+        ]
+        if not rows:
+            return
+        conn = _connect(self.memory_path)
+        try:
+            with conn:
+                conn.executemany('INSERT OR REPLACE INTO translation_memory VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+        finally:
+            conn.close()
@@ -1,17 +1,51 @@
-
 import pandas as pd
+import argparse
 import json
 import os
+import sys
+from pathlib import Path
+from xlsx_io import read_translation_sheet
+from pipeline_store import has_stage, load_stage, stage_xlsx_path
+from catalog_merge import changed_rows, three_way_merge
+from translation_catalog import LOCALES_DIR, ROOT_DIR, load_app_locales
+
+# Returned workbook: never the export itself, which the pipeline rewrites
+VENDOR_FILE = ROOT_DIR / "TRADUCCIONES_PROVEEDOR.xlsx"
+
+def _cell(value):
+    if value is None:
+        return "*(vacía)*"
+    return "`" + str(value).replace("|", "\\|").replace("\n", " ") + "`"
 
-def update_translation_files():
+def update_translation_files(vendor_file=None, dry_run=False):
     """
-    Actualiza los archivos de traducción en el repositorio con las correcciones.
+    Actualiza los archivos de traducción del repositorio con la exportación
+    corregida y las ediciones del proveedor mediante una fusión a tres
+    bandas: los locales tal como estaban al exportar (etapa
+    locales_exportados), el archivo devuelto (la exportación más las
+    ediciones) y los locales actuales. Las claves cambiadas en el
+    repositorio desde la exportación no se sobrescriben; si ambos lados las
+    cambiaron, se listan como conflictos.
     """
-    
-    # Cargar el archivo corregido
-    corrected_file = "/home/ubuntu/piano-emotion-manager/TRADUCCIONES_CORREGIDAS_PARA_REVISOR.xlsx"
-    df = pd.read_excel(corrected_file)
-    
+
+    # Cargar el archivo devuelto por el proveedor (una copia aparte de la exportación)
+    vendor_file = Path(VENDOR_FILE if vendor_file is None else vendor_file)
+    export_file = stage_xlsx_path("corregidas_para_revisor")
+    if vendor_file.resolve() == export_file.resolve():
+        sys.exit(f"El archivo del proveedor no puede ser la propia exportación ({export_file.name}): "
+                 f"guárdelo como {VENDOR_FILE.name} o indíquelo con --proveedor.")
+    if not vendor_file.exists():
+        sys.exit(f"Falta el archivo devuelto por el proveedor: {vendor_file}")
+    df = read_translation_sheet(vendor_file)
+
+    # La base son los locales al exportar; la exportación solo sirve para contar las ediciones del proveedor
+    for stage in ("corregidas_para_revisor", "locales_exportados"):
+        if not has_stage(stage):
+            sys.exit(f"Falta la etapa '{stage}' (se guarda al exportar con apply_terminology_corrections.py); "
+                     "sin ella no se puede distinguir qué cambió desde la exportación.")
+    exported = load_stage("corregidas_para_revisor")
+    base = load_stage("locales_exportados")
+
     # Mapeo de idiomas a códigos
     lang_map = {
         "Español": "es",
@@ -24,57 +58,93 @@ def update_translation_files():
         "Noruego": "no",
         "Sueco": "sv"
     }
-    
-    locales_dir = "/home/ubuntu/piano-emotion-manager/locales"
-    
-    print("Actualizando archivos de traducción en el repositorio...")
-    
-    # Para cada idioma, actualizar el archivo JSON
+
+    locales_dir = LOCALES_DIR
+
+    print("Fusionando las ediciones del proveedor con los archivos de traducción...")
+
+    current, current_df = load_app_locales(lang_map, locales_dir)
+    result = three_way_merge(base, df, current_df, languages=list(lang_map))
+    vendor_rows = changed_rows(exported, df, languages=list(lang_map))
+    merged = result.merged
+    keys = merged["Clave"].to_numpy(dtype=object)
+
+    print(f"  Filas editadas por el proveedor: {vendor_rows}")
+    print(f"  Filas que cambian respecto de los locales exportados: {result.rows_changed}")
+    print(f"  Celdas aplicadas: {len(result.applied)}")
+    print(f"  Conflictos: {len(result.conflicts)}")
+
+    # Para cada idioma, reescribir el JSON solo si la fusión lo cambia
+    updated = []
     for lang_name, lang_code in lang_map.items():
-        print(f"\nProcesando {lang_name} ({lang_code})...")
-        
-        # Crear diccionario de traducciones
-        translations = {}
-        
-        for idx, row in df.iterrows():
-            clave = row["Clave"]
-            valor = row[lang_name]
-            
-            if pd.notna(valor) and valor != "":
-                translations[clave] = str(valor)
-        
-        # Guardar en archivo JSON
+        values = merged[lang_name].to_numpy(dtype=object)
+        present = pd.notna(values)
+        merged_translations = dict(zip(keys[present], (str(value) for value in values[present])))
+
+        # Se mantiene el orden del archivo actual; las claves nuevas van al final
+        translations = {key: merged_translations[key] for key in current[lang_name] if key in merged_translations}
+        translations.update(merged_translations)
+        if translations == current[lang_name]:
+            continue
+
         file_path = os.path.join(locales_dir, f"{lang_code}.json")
-        
+        updated.append((lang_name, lang_code))
+        if dry_run:
+            print(f"  · {lang_code}.json cambiaría ({len(translations)} traducciones)")
+            continue
         with open(file_path, "w", encoding="utf-8") as f:
             json.dump(translations, f, ensure_ascii=False, indent=2)
-        
+
         print(f"  ✓ {len(translations)} traducciones guardadas en {file_path}")
-    
-    print("\n✓ Todos los archivos de traducción han sido actualizados")
-    
+
+    if dry_run:
+        print("\nSimulación: no se ha escrito ningún archivo")
+        return result
+
+    print("\n✓ Archivos de traducción actualizados")
+
     # Generar reporte
     report = []
     report.append("# Reporte de Actualización de Archivos de Traducción\n\n")
     report.append(f"**Fecha:** {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+    report.append("## Fusión\n\n")
+    report.append(f"- Filas editadas por el proveedor: {vendor_rows}\n")
+    report.append(f"- Filas que cambian respecto de los locales exportados: {result.rows_changed}\n")
+    report.append(f"- Celdas aplicadas: {len(result.applied)}\n")
+    report.append(f"- Conflictos (se conserva el valor actual): {len(result.conflicts)}\n\n")
     report.append("## Archivos Actualizados\n\n")
-    
-    for lang_name, lang_code in lang_map.items():
+
+    for lang_name, lang_code in updated:
         file_path = os.path.join(locales_dir, f"{lang_code}.json")
         if os.path.exists(file_path):
             file_size = os.path.getsize(file_path)
             report.append(f"- `{lang_code}.json` ({file_size} bytes) - {lang_name}\n")
-    
+    if not updated:
+        report.append("*Ningún archivo ha cambiado.*\n")
+
+    if len(result.conflicts):
+        report.append("\n## Conflictos\n\n")
+        report.append("| Clave | Idioma | Base | Proveedor | Actual |\n")
+        report.append("|---|---|---|---|---|\n")
+        for clave, idioma, base_value, vendor_value, current_value in result.conflicts.itertuples(index=False, name=None):
+            report.append(f"| `{clave}` | {idioma} | {_cell(base_value)} | {_cell(vendor_value)} | {_cell(current_value)} |\n")
+
     report.append("\n## Próximos Pasos\n\n")
-    report.append("1. Hacer commit de los cambios\n")
-    report.append("2. Hacer push al repositorio\n")
-    report.append("3. Desplegar en Vercel\n")
-    
-    report_file = "/home/ubuntu/piano-emotion-manager/REPORTE_ACTUALIZACION_ARCHIVOS.md"
+    report.append("1. Resolver los conflictos, si los hay\n")
+    report.append("2. Hacer commit de los cambios\n")
+    report.append("3. Hacer push al repositorio\n")
+    report.append("4. Desplegar en Vercel\n")
+
+    report_file = ROOT_DIR / "REPORTE_ACTUALIZACION_ARCHIVOS.md"
     with open(report_file, "w", encoding="utf-8") as f:
         f.write("\n".join(report))
-    
+
     print(f"\n✓ Reporte: {report_file}")
+    return result
 
 if __name__ == "__main__":
-    update_translation_files()
+    parser = argparse.ArgumentParser(description="Fusiona las ediciones del proveedor en locales/.")
+    parser.add_argument("--proveedor", help=f"Archivo xlsx devuelto por el proveedor (por defecto, {VENDOR_FILE.name})")
+    parser.add_argument("--simular", action="store_true", help="Muestra qué cambiaría sin escribir archivos")
+    args = parser.parse_args()
+    update_translation_files(args.proveedor, args.simular)
@@ -0,0 +1,190 @@
+
+import hashlib
+import json
+import os
+import sqlite3
+from pathlib import Path
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+# Bump when the sidecar layout changes to force a rebuild
+SIDECAR_VERSION = '2'
+
+HEADER_STYLE = 'Traducciones Cabecera'
+CELL_STYLE = 'Traducciones Celda'
+
+
+def _thin_border():
+    side = Side(style='thin')
+    return Border(left=side, right=side, top=side, bottom=side)
+
+
+def register_styles(wb):
+    """
+    Registra una sola vez los estilos con nombre que usan todas las celdas.
+    """
+    header = NamedStyle(name=HEADER_STYLE)
+    header.fill = PatternFill(start_color='4472C4', end_color='4472C4', fill_type='solid')
+    header.font = Font(bold=True, color='FFFFFF')
+    header.border = _thin_border()
+    header.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
+    wb.add_named_style(header)
+
+    cell = NamedStyle(name=CELL_STYLE)
+    cell.border = _thin_border()
+    cell.alignment = Alignment(horizontal='left', vertical='top', wrap_text=True)
+    wb.add_named_style(cell)
+
+
+def write_translation_sheet(output_file, headers, rows, title='Traducciones', first_width=40, width=25):
+    """
+    Escribe una hoja de traducciones en modo write-only (streaming).
+
+    `rows` puede ser cualquier iterable de secuencias de valores; las filas se
+    escriben a disco a medida que se generan, con memoria acotada
+    independientemente del número de claves e idiomas. Devuelve el número de
+    filas de datos escritas.
+    """
+    wb = Workbook(write_only=True)
+    register_styles(wb)
+    ws = wb.create_sheet(title)
+
+    # Column widths and frozen header must be set before streaming rows
+    ws.column_dimensions[get_column_letter(1)].width = first_width
+    for col_num in range(2, len(headers) + 1):
+        ws.column_dimensions[get_column_letter(col_num)].width = width
+    ws.freeze_panes = 'A2'
+
+    def styled(value, style):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style
+        return cell
+
+    ws.append([styled(header, HEADER_STYLE) for header in headers])
+    count = 0
+    for row in rows:
+        ws.append([styled(value, CELL_STYLE) for value in row])
+        count += 1
+
+    wb.save(output_file)
+    return count
+
+
+def sidecar_path(xlsx_path):
+    xlsx_path = Path(xlsx_path)
+    return xlsx_path.with_name(xlsx_path.name + '.sqlite')
+
+
+def sheet_headers(header_row):
+    """
+    Nombres de columna como los pone pandas.read_excel: 'Unnamed: <n>' para
+    las cabeceras vacías y sufijos '.1', '.2'... para las repetidas.
+    """
+    blank = [header is None for header in header_row]
+    headers = [None if is_blank else str(header) for header, is_blank in zip(header_row, blank)]
+    written = {header for header in headers if header is not None}
+    used = set()
+
+    def unique(name, avoid):
+        candidate, count = name, 0
+        while candidate in used or (count and candidate in avoid):
+            count += 1
+            candidate = f'{name}.{count}'
+        used.add(candidate)
+        return candidate
+
+    # Written headers first (a suffix never takes a name written elsewhere), then the blank ones
+    for i, is_blank in enumerate(blank):
+        if not is_blank:
+            headers[i] = unique(headers[i], written)
+    for i, is_blank in enumerate(blank):
+        if is_blank:
+            headers[i] = unique(f'Unnamed: {i}', ())
+    return headers
+
+
+def stream_sheet_columns(xlsx_path):
+    """
+    Lee la primera hoja en modo read-only, fila a fila, y devuelve
+    (cabeceras, columnas) con una lista de valores por columna. Las celdas
+    vacías quedan como None; las cabeceras se nombran con sheet_headers().
+    """
+    wb = load_workbook(xlsx_path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header_row = next(rows, ())
+        width = len(header_row)
+        while width and header_row[width - 1] is None:
+            width -= 1
+        headers = sheet_headers(header_row[:width])
+        columns = [[] for _ in headers]
+        for row in rows:
+            if not any(value is not None for value in row[:width]):
+                continue
+            for i, column in enumerate(columns):
+                column.append(row[i] if i < len(row) else None)
+    finally:
+        wb.close()
+    return headers, columns
+
+
+def _read_sidecar(path, digest):
+    if not path.exists():
+        return None
+    try:
+        with sqlite3.connect(path) as conn:
+            meta = dict(conn.execute('SELECT key, value FROM meta'))
+            if meta.get('version') != SIDECAR_VERSION or meta.get('sha256') != digest:
+                return None
+            headers = json.loads(meta['headers'])
+            records = conn.execute('SELECT * FROM sheet ORDER BY rowid').fetchall()
+    except sqlite3.DatabaseError:
+        return None
+    columns = [list(column) for column in zip(*records)] if records else [[] for _ in headers]
+    return headers, columns
+
+
+def _write_sidecar(path, digest, headers, columns):
+    # One temporary file per process: parallel pipeline steps may build the same sidecar
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    tmp_path.unlink(missing_ok=True)
+    with sqlite3.connect(tmp_path) as conn:
+        # Positional column names: headers live in meta (SQLite names are case-insensitive)
+        conn.execute('CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)')
+        conn.execute(f'CREATE TABLE sheet ({", ".join(f"c{i}" for i in range(len(headers)))})')
+        placeholders = ', '.join('?' * len(headers))
+        conn.executemany(f'INSERT INTO sheet VALUES ({placeholders})', zip(*columns))
+        conn.executemany('INSERT INTO meta VALUES (?, ?)', [
+            ('version', SIDECAR_VERSION), ('sha256', digest), ('headers', json.dumps(headers, ensure_ascii=False)),
+        ])
+    conn.close()
+    tmp_path.replace(path)
+
+
+def read_translation_sheet(xlsx_path, use_sidecar=True):
+    """
+    Lee un TRADUCCIONES_*.xlsx como DataFrame.
+
+    La primera lectura recorre el libro en streaming y guarda las columnas en
+    un sidecar SQLite (`<archivo>.xlsx.sqlite`) asociado al hash SHA-256 del
+    xlsx; las lecturas siguientes cargan el sidecar directamente mientras el
+    xlsx no cambie.
+    """
+    import pandas as pd
+
+    xlsx_path = Path(xlsx_path)
+    digest = hashlib.sha256(xlsx_path.read_bytes()).hexdigest()
+    sidecar = sidecar_path(xlsx_path)
+
+    loaded = _read_sidecar(sidecar, digest) if use_sidecar else None
+    if loaded is None:
+        loaded = stream_sheet_columns(xlsx_path)
+        if use_sidecar:
+            _write_sidecar(sidecar, digest, *loaded)
+
+    headers, columns = loaded
+    df = pd.DataFrame(dict(enumerate(columns)), columns=range(len(headers)))
+    df.columns = headers
+    return df